@@ -8,6 +8,11 @@ Commands
     print: Prints a tracked repo.
     glorify: Generate the hall of fame.
     code: Generate MD or RST integration code.
+    convert: Saves all tracked repos again in --save_format.
+    reindex: Rebuilds the index of tracked repos.
+    set_fetcher: Sets GitHub API to fetch commits of a repo with.
+    serve: Serves images and links of all repos over HTTP.
+    cleanup: Deletes cached avatars and user mappings not used for a while.
 """
 
 __copyright__ = '2018 Sourcerer, Inc.'
@@ -18,6 +23,10 @@ import os.path
 
 from tabulate import tabulate
 
+import fame.github_graphql
+import fame.glory
+import fame.parallel
+import fame.server
 import fame.storage
 import fame.ssl_hack
 from fame.code_gen import make_md_code, make_rst_code
@@ -33,18 +42,25 @@ class Command:
     PRINT = 'print'
     GLORIFY = 'glorify'
     CODE = 'code'
+    CONVERT = 'convert'
+    REINDEX = 'reindex'
+    SET_FETCHER = 'set_fetcher'
+    SERVE = 'serve'
+    CLEANUP = 'cleanup'
 
     @staticmethod
     def is_repo_command(command):
         return command in [
             Command.ADD, Command.REMOVE, Command.UPDATE,
-            Command.PRINT, Command.GLORIFY]
+            Command.PRINT, Command.GLORIFY, Command.SET_FETCHER]
 
     @staticmethod
     def get_all():
         return [
             Command.ADD, Command.REMOVE, Command.UPDATE,
-            Command.LIST, Command.PRINT, Command.GLORIFY, Command.CODE]
+            Command.LIST, Command.PRINT, Command.GLORIFY, Command.CODE,
+            Command.CONVERT, Command.REINDEX, Command.SET_FETCHER,
+            Command.SERVE, Command.CLEANUP]
 
 
 def parse_args():
@@ -75,6 +91,32 @@ def parse_args():
     parser.add_argument('--no_ssl_host_check', action='store_true',
                         default=False,
                         help='Disable SSL host checks, useful for debugging')
+    parser.add_argument('--save_format', type=str,
+                        choices=RepoTracker.FORMATS, default=RepoTracker.TEXT,
+                        help='Format to save tracked repos in')
+    parser.add_argument('--install_mode', type=str,
+                        choices=Glory.INSTALL_MODES,
+                        default=Glory.TEMP_INSTALL,
+                        help='How to install generated hall of fame, direct '
+                             'makes half the writes, but a longer window '
+                             'with images and links out of sync')
+    parser.add_argument('--compress_images', action='store_true',
+                        default=False,
+                        help='Save images gzipped, for serving compressed')
+    parser.add_argument('--output', type=str,
+                        choices=Glory.OUTPUTS, default=Glory.SLOTS_OUTPUT,
+                        help='Images per slot, a single bundle, or both')
+    parser.add_argument('--fetcher', type=str,
+                        choices=sorted(RepoTracker.FETCHERS), default='rest',
+                        help='GitHub API to fetch commits with')
+    parser.add_argument('--github_graphql_url', type=str,
+                        default=fame.github_graphql.GRAPHQL_URL,
+                        help='GitHub GraphQL API endpoint')
+    parser.add_argument('--max_in_flight', type=int,
+                        default=fame.parallel.MAX_IN_FLIGHT,
+                        help='Max number of concurrent network requests')
+    parser.add_argument('--port', type=int, default=8080,
+                        help='Port to serve at')
     args = parser.parse_args()
 
     if Command.is_repo_command(args.command) or args.command == Command.CODE:
@@ -103,6 +145,10 @@ def main():
     if args.no_ssl_host_check:
         fame.ssl_hack.disable_ssl_host_check()
 
+    fame.parallel.configure(args.max_in_flight)
+    RepoTracker.set_save_format(args.save_format)
+    RepoTracker.set_graphql_url(args.github_graphql_url)
+
     if args.work_dir:
         fame.storage.configure_for_local(args.work_dir)
     elif args.gcloud_bucket:
@@ -117,7 +163,7 @@ def main():
                               args.token)
 
         if args.command == Command.ADD:
-            tracker.add()
+            tracker.add(args.fetcher)
         elif args.command == Command.REMOVE:
             tracker.remove()
         elif args.command == Command.UPDATE:
@@ -136,8 +182,22 @@ def main():
             print(repo)
         elif args.command == Command.GLORIFY:
             repo = tracker.load()
-            glory = Glory(args.sourcerer_origin, args.sourcerer_api_origin)
+            glory = Glory(args.sourcerer_origin, args.sourcerer_api_origin,
+                          args.install_mode, args.compress_images,
+                          args.output)
             glory.make(repo)
+        elif args.command == Command.CONVERT:
+            for result in RepoTracker.list(args.user):
+                tracker.configure(result.user, result.owner, result.repo)
+                tracker.convert()
+        elif args.command == Command.REINDEX:
+            RepoTracker.rebuild_index()
+        elif args.command == Command.SET_FETCHER:
+            tracker.set_fetcher(args.fetcher)
+        elif args.command == Command.SERVE:
+            fame.server.serve(port=args.port)
+        elif args.command == Command.CLEANUP:
+            fame.glory.cleanup_caches()
         elif args.command == Command.CODE:
             if args.format == 'md':
                 print(make_md_code(args.user, args.owner, args.repo))
@@ -3,23 +3,38 @@
 __author__ = 'Sergey Surkov'
 __copyright__ = '2018 Sourcerer, Inc'
 
-import base64
 import re
-from urllib.request import urlopen
+from collections import namedtuple
 from xml.etree import ElementTree
 
+from .avatar_cache import avatar_cache, sourcerer_avatar_cache
+from .cache import LRUCache
+from .svg_render import SvgTemplate, escape_attribute, get_child_svg, slot
 from .svg_templates import SVG_GITHUB, SVG_BADGE, SVG_LEGEND, SVG_EMPTY
 
 
 # Height of a finished Hall-of-fame image.
 FINAL_HEIGHT = "90px"
 
+NS = {'svg': 'http://www.w3.org/2000/svg'}
+XLINK_HREF = '{http://www.w3.org/1999/xlink}href'
+
+# Placeholder element for a badge in an avatar template.
+BADGE_PLACEHOLDER = 'badge-placeholder'
+
 
 class AvatarError(Exception):
     def __init__(self, message):
         super().__init__(message)
 
 
+# A finished badge. Nested template only has slots for the badge position.
+Badge = namedtuple(
+    'Badge',
+    ['label_w', 'value_w', 'badge_w', 'badge_h', 'clip_id',
+     'svg', 'nested_template'])
+
+
 class Badger:
     BADGE_H = 50
     BADGE_OFF = 10
@@ -32,20 +47,25 @@ class Badger:
     # Badge colors.
     BADGE_COLORS = {NEW: '#4CB04F', TRENDING: '#2B95CF', TOP: '#F28F56'}
 
+    # A supercrude way to estimate symbol widths.
+    SYMBOLS = {s: 20 for s in ' 0123456789abcdefghijklmnopqrstuvwxyz'}
+    SYMBOLS.update({s: 9 for s in 'fjt'})
+    SYMBOLS.update({s: 5 for s in 'il'})
+    SYMBOLS.update({s: 30 for s in 'mw'})
+
+    # Finished badges by label and value, shared by all badgers.
+    MAX_CACHED = 1024
+    cache = LRUCache(MAX_CACHED)
+
     """Badger makes badges. In case you wonder."""
     def __init__(self):
-        # A supercrude way to estimate symbol widths.
-        self.symbols = {s: 20 for s in ' 0123456789abcdefghijklmnopqrstuvwxyz'}
-        self.symbols.update({s: 9 for s in 'fjt'})
-        self.symbols.update({s: 5 for s in 'il'})
-        self.symbols.update({s: 30 for s in 'mw'})
-
-        self.svg = None
         self.label = ''
         self.value = ''
+        self.clip_id = ''
         self.badge_w = self.badge_h = 0
         self.label_w = self.value_w = 0
         self.badge_off = Badger.BADGE_OFF
+        self.badge = None
 
     def make_badge(self, label, value):
         if label not in [Badger.TRENDING, Badger.NEW, Badger.TOP]:
@@ -55,22 +75,40 @@ class Badger:
         self.value = str(value)
         self.value_color = Badger.BADGE_COLORS[self.label]
 
+        key = (self.label, self.value)
+        self.badge = Badger.cache.get(key)
+        if not self.badge:
+            self.badge = self._make_badge()
+            Badger.cache.put(key, self.badge)
+
+        self.label_w = self.badge.label_w
+        self.value_w = self.badge.value_w
+        self.badge_w = self.badge.badge_w
+        self.badge_h = self.badge.badge_h
+        self.clip_id = self.badge.clip_id
+
+    def get_svg_string(self):
+        return self.badge.svg
+
+    def get_nested_svg_string(self, x, y):
+        """Returns the badge as nested into another SVG at (x, y)."""
+        return self.badge.nested_template.render(
+            x='%.02f' % x, y='%.02f' % y)
+
+    def _make_badge(self):
         self._estimate_badge_size()
-        self._make_badge()
 
         # Since there can be multiple badges in the same SVG,
         # let's make sure we have a reasonaly unique URL for clipPath.
-        ns = {'svg': 'http://www.w3.org/2000/svg'}
-        clip_path = self.svg.find('svg:defs/svg:clipPath', namespaces=ns)
-        clip_id = '%s-%s-%s' % (clip_path.get('id'), label, value)
-        clip_id = re.sub('[^a-z0-9]+', '-', clip_id)
-        clip_path.set('id', clip_id)
+        clip_id = '%s-%s-%s' % (BADGE_CLIP_ID, self.label, self.value)
+        self.clip_id = re.sub('[^a-z0-9]+', '-', clip_id)
 
-        clipped_g = self.svg.find('svg:g[@clip-path]', namespaces=ns)
-        clipped_g.set('clip-path', 'url(#%s)' % clip_id)
-
-    def get_svg_string(self):
-        return ElementTree.tostring(self.svg, encoding='unicode')
+        values = self._get_slot_values()
+        svg = BADGE_TEMPLATE.render(**values)
+        nested_template = SvgTemplate(NESTED_BADGE_TEMPLATE.render(
+            x=slot('x'), y=slot('y'), **values))
+        return Badge(self.label_w, self.value_w, self.badge_w, self.badge_h,
+                     self.clip_id, svg, nested_template)
 
     def _estimate_badge_size(self):
         # All sizes are relative units.
@@ -80,24 +118,51 @@ class Badger:
         self.badge_h = Badger.BADGE_H
 
     def _estimate_string_size(self, s):
-        return sum([self.symbols[c] for c in s]) + 20
-
-    def _make_badge(self):
+        return sum([Badger.SYMBOLS[c] for c in s]) + 20
+
+    def _get_slot_values(self):
+        # Labels and values are limited to known symbols, no need to escape.
+        return {
+            'badge_w': str(self.badge_w),
+            'badge_h': str(self.badge_h),
+            'label_w': str(self.label_w),
+            'label_x': str(self.label_w / 2),
+            'label_y': str(self.badge_h - 13),
+            'label_text': self.label,
+            'value_x': str(self.badge_w - self.value_w / 2),
+            'value_y': str(self.badge_h - 13),
+            'value_w': str(self.value_w),
+            'value_text': self.value,
+            'value_color': self.value_color,
+            'width': '%.02f' % self.badge_w,
+            'height': '%.02f' % self.badge_h,
+            'clip_id': self.clip_id}
+
+    @staticmethod
+    def make_template_element():
+        """Makes badge SVG with slots for all values."""
         svg = SVG_BADGE.format(
-           badge_w=self.badge_w, badge_h=self.badge_h,
-           label_w=self.label_w,
-           label_x=self.label_w / 2, label_y=self.badge_h - 13,
-           label_text=self.label,
-           value_x=self.badge_w - self.value_w / 2,
-           value_y=self.badge_h - 13,
-           value_w=self.value_w,
-           value_text=self.value, value_color=self.value_color)
-        self.svg = ElementTree.fromstring(svg)
+           badge_w=slot('badge_w'), badge_h=slot('badge_h'),
+           label_w=slot('label_w'),
+           label_x=slot('label_x'), label_y=slot('label_y'),
+           label_text=slot('label_text'),
+           value_x=slot('value_x'),
+           value_y=slot('value_y'),
+           value_w=slot('value_w'),
+           value_text=slot('value_text'), value_color=slot('value_color'))
+        element = ElementTree.fromstring(svg)
+
+        element.set('width', slot('width'))
+        element.set('height', slot('height'))
+        element.set('viewBox', '0 0 %s %s' % (slot('width'), slot('height')))
 
-        self.svg.set('width', '%.02f' % self.badge_w)
-        self.svg.set('height', '%.02f' % self.badge_h)
-        self.svg.set(
-            'viewBox', '0 0 %.02f %.02f' % (self.badge_w, self.badge_h))
+        clip_path = element.find('svg:defs/svg:clipPath', namespaces=NS)
+        clip_path.set('id', slot('clip_id'))
+
+        clipped_g = element.find('svg:g[@clip-path]', namespaces=NS)
+        clipped_g.set('clip-path', 'url(#%s)' % slot('clip_id'))
+
+        return element
 
 
 class AvatarAdorner:
@@ -105,17 +170,30 @@ class AvatarAdorner:
 
     PADDING = 10  # Padding on each side of an adorned avatar.
 
+    # Templates made of Sourcerer avatars, by avatar URL and version.
+    MAX_TEMPLATES_SIZE = 16 * 1024 * 1024  # Max total size of templates.
+    templates = LRUCache(MAX_TEMPLATES_SIZE)
+
     def init_with_face(self, face_url):
-        self.svg = ElementTree.fromstring(SVG_GITHUB)
-        self._init_face_image()
-        self.face_image.set(
-            '{http://www.w3.org/1999/xlink}href', face_url)
+        self.svg = None  # GitHub avatars are rendered from a template.
+        self.face_url = face_url
+        self.template = GITHUB_TEMPLATE
+        self.face_w, self.face_h = GITHUB_FACE_SIZE
 
     def init_with_sourcerer(self, sourcerer_avatar_url):
-        response = urlopen(sourcerer_avatar_url)
-        data = response.read()
-        self.svg = ElementTree.fromstring(data)
-        self._init_face_image()
+        svg, version = sourcerer_avatar_cache.get_svg(
+            sourcerer_avatar_url, AvatarAdorner.embed_sourcerer_face)
+        self.face_url = None  # Sourcerer faces come embedded.
+        self.template_key = (sourcerer_avatar_url, version)
+        cached = AvatarAdorner.templates.get(self.template_key)
+        if cached:
+            self.svg = None
+            self.template, self.face_w, self.face_h = cached
+            return
+
+        self.svg = ElementTree.fromstring(svg)
+        self.svg_string = svg
+        self.template = None
 
     def adorn(self, badge, count):
         """Adorns an avatar with a badge.
@@ -129,60 +207,98 @@ class AvatarAdorner:
         self.badger = Badger()
 
         self._embed_face()
-        self._init_sizes()
-        self._nest_svg()
+        if not self.template:
+            self._init_sizes()
+            self.template = AvatarAdorner.make_template(self.svg)
+            AvatarAdorner.templates.put(
+                self.template_key, (self.template, self.face_w, self.face_h),
+                size=len(self.svg_string))
         self._make_badge()
 
     def get_avatar_svg(self):
-        return ElementTree.tostring(self.svg, encoding='unicode')
+        return self.avatar_svg
+
+    @staticmethod
+    def make_template(svg):
+        """Makes a template for an adorned avatar out of a face SVG.
+
+        The face SVG is nested, and the template has slots for the face
+        position, the final size, and the badge.
+        """
+        children = [c for c in svg]
+        face_svg = ElementTree.SubElement(svg, 'svg')
+        for child in children:
+            svg.remove(child)
+            face_svg.append(child)
+
+        face_w, face_h = AvatarAdorner._get_size(svg)
+        face_svg.set('width', '%.02f' % face_w)
+        face_svg.set('height', '%.02f' % face_h)
 
-    def _init_face_image(self):
-        ns = {'svg': 'http://www.w3.org/2000/svg'}
-        self.face_image = self.svg.find('svg:image', namespaces=ns)
+        svg.set('height', FINAL_HEIGHT)
+        ElementTree.SubElement(svg, BADGE_PLACEHOLDER)
+
+        face_svg.set('x', slot('face_x'))
+        svg.set('viewBox', '0 0 %s %s' % (slot('w'), slot('h')))
+
+        rendered = ElementTree.tostring(svg, encoding='unicode')
+        rendered = rendered.replace('<%s />' % BADGE_PLACEHOLDER,
+                                    slot('badge'))
+        return SvgTemplate(rendered)
+
+    @staticmethod
+    def get_sourcerer_version(sourcerer_avatar_url):
+        """Returns a string that changes whenever a Sourcerer avatar does."""
+        _, version = sourcerer_avatar_cache.get_svg(
+            sourcerer_avatar_url, AvatarAdorner.embed_sourcerer_face)
+        return version
+
+    @staticmethod
+    def embed_sourcerer_face(data):
+        """Embeds the face image into a Sourcerer avatar SVG.
+
+        Args:
+          data: Sourcerer avatar SVG.
+        Returns:
+          The avatar SVG with the face as a data URL, a string.
+        """
+        svg = ElementTree.fromstring(data)
+        face_image = svg.find('svg:image', namespaces=NS)
+        face_url = face_image.get(XLINK_HREF)
+        face_image.set(XLINK_HREF, AvatarAdorner._get_face_data_url(face_url))
+        return ElementTree.tostring(svg, encoding='unicode')
 
     def _embed_face(self):
         """Embeds referenced face image into the SVG.
 
         Browsers don't display referenced images in <img>.
         """
-        face_url = self.face_image.get('{http://www.w3.org/1999/xlink}href')
+        if self.face_url is None:
+            return  # Embedded already.
+        self.face_url = AvatarAdorner._get_face_data_url(self.face_url)
+
+    @staticmethod
+    def _get_face_data_url(face_url):
         if face_url.startswith('data:image/'):
-            return
+            return face_url
         if not face_url.startswith('http'):
             # Relative path.
             face_url = 'https://sourcerer.io' + face_url
-
-        response = urlopen(face_url)
-        content_type = response.headers.get_content_type()
-        data = response.read()
-        encoded = base64.b64encode(data).decode()
-        data_url = 'data:%s;base64,%s' % (content_type, encoded)
-        self.face_image.set('{http://www.w3.org/1999/xlink}href', data_url)
-        print('i Embedded JPEG %s' % face_url)
+        return avatar_cache.get_data_url(face_url)
 
     def _init_sizes(self):
-        view_box = self.svg.get('viewBox')
+        self.face_w, self.face_h = AvatarAdorner._get_size(self.svg)
+
+    @staticmethod
+    def _get_size(svg):
+        view_box = svg.get('viewBox')
         if not view_box:
             raise AvatarError('No viewBox found')
-        _, _, self.face_w, self.face_h = map(float, view_box.split(' '))
-
-    def _nest_svg(self):
-        """Puts the input SVG under a nested SVG tag."""
-        children = [c for c in self.svg]
-        face_svg = ElementTree.SubElement(self.svg, 'svg')
-        for child in children:
-            self.svg.remove(child)
-            face_svg.append(child)
-        face_svg.set('width', '%.02f' % self.face_w)
-        face_svg.set('height', '%.02f' % self.face_h)
-        self.face_svg = face_svg
-
-        self.svg.set('height', FINAL_HEIGHT)
+        _, _, w, h = map(float, view_box.split(' '))
+        return w, h
 
     def _make_badge(self):
         self.badger.make_badge(self.badge, self.badge_count)
-        badge_svg = self.badger.svg
-        self.svg.append(badge_svg)
 
         # Make space for the badge and position the face and the badge.
         face_w, face_h = self.face_w, self.face_h
@@ -191,35 +307,51 @@ class AvatarAdorner:
         h = face_h + badge_h + self.badger.badge_off
         w = max(face_w, badge_w) + AvatarAdorner.PADDING * 2
 
-        self.face_svg.set('x', '%.02f' % ((w - face_w) / 2))  # Center face.
-        badge_svg.set('x', '%.02f' % ((w - badge_w) / 2))  # Center badge.
+        face_x = (w - face_w) / 2  # Center face.
+        badge_x = (w - badge_w) / 2  # Center badge.
+        badge_y = face_h + self.badger.badge_off
+        badge_svg = self.badger.get_nested_svg_string(badge_x, badge_y)
 
-        self.svg.set('viewBox', '0 0 %.02f %.02f' % (w, h))
-        badge_svg.set('y', '%.02f' % (face_h + self.badger.badge_off))
+        values = {'face_x': '%.02f' % face_x,
+                  'w': '%.02f' % w, 'h': '%.02f' % h,
+                  'badge': badge_svg}
+        if self.face_url is not None:
+            values['face_url'] = escape_attribute(self.face_url)
+        self.avatar_svg = self.template.render(**values)
 
 
 class Spacer:
     """Spacer makes static/predefined images."""
     def make_legend(self):
+        self.svg_string = LEGEND_SVG
+
+    def make_empty(self):
+        self.svg_string = EMPTY_SVG
+
+    def get_spacer_svg(self):
+        return self.svg_string
+
+    @staticmethod
+    def render_legend():
         svg = SVG_LEGEND.format(
             new_color=Badger.BADGE_COLORS[Badger.NEW],
             trending_color=Badger.BADGE_COLORS[Badger.TRENDING],
             top_color=Badger.BADGE_COLORS[Badger.TOP])
-        self.svg = ElementTree.fromstring(svg)
+        svg = ElementTree.fromstring(svg)
 
         # Adjust root SVG size.
-        view_box = self.svg.get('viewBox')
+        view_box = svg.get('viewBox')
         _, _, w, h = map(float, view_box.split(' '))
         h += Badger.BADGE_H + Badger.BADGE_OFF  # For consitency with avatars.
-        self.svg.set('viewBox', '0 0 %.02f %.02f' % (w, h))
-        self.svg.set('height', FINAL_HEIGHT)
+        svg.set('viewBox', '0 0 %.02f %.02f' % (w, h))
+        svg.set('height', FINAL_HEIGHT)
+        return ElementTree.tostring(svg, encoding='unicode')
 
-    def make_empty(self):
-        self.svg = ElementTree.fromstring(SVG_EMPTY)
-        self.svg.set('height', FINAL_HEIGHT)
-
-    def get_spacer_svg(self):
-        return ElementTree.tostring(self.svg, encoding='unicode')
+    @staticmethod
+    def render_empty():
+        svg = ElementTree.fromstring(SVG_EMPTY)
+        svg.set('height', FINAL_HEIGHT)
+        return ElementTree.tostring(svg, encoding='unicode')
 
 
 def register_svg_namespaces():
@@ -230,4 +362,30 @@ def register_svg_namespaces():
         ElementTree.register_namespace(prefix, uri)
 
 
+def compile_templates():
+    """Renders everything that doesn't depend on entries once."""
+    global BADGE_CLIP_ID, BADGE_TEMPLATE, NESTED_BADGE_TEMPLATE
+    global GITHUB_TEMPLATE, GITHUB_FACE_SIZE, LEGEND_SVG, EMPTY_SVG
+
+    BADGE_CLIP_ID = re.search(r'<clipPath id="([^"]+)"', SVG_BADGE).group(1)
+    BADGE_TEMPLATE = SvgTemplate.from_element(
+        Badger.make_template_element())
+
+    badge = Badger.make_template_element()
+    badge.set('x', slot('x'))
+    badge.set('y', slot('y'))
+    parent = ElementTree.Element('{%s}svg' % NS['svg'])
+    parent.append(badge)
+    NESTED_BADGE_TEMPLATE = SvgTemplate(get_child_svg(parent))
+
+    face = ElementTree.fromstring(SVG_GITHUB)
+    face.find('svg:image', namespaces=NS).set(XLINK_HREF, slot('face_url'))
+    GITHUB_FACE_SIZE = AvatarAdorner._get_size(face)
+    GITHUB_TEMPLATE = AvatarAdorner.make_template(face)
+
+    LEGEND_SVG = Spacer.render_legend()
+    EMPTY_SVG = Spacer.render_empty()
+
+
 register_svg_namespaces()
+compile_templates()
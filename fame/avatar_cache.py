@@ -0,0 +1,210 @@
+"""Caches of avatar images embedded into SVGs.
+
+The same contributors show up in many tracked repos, so their avatars are
+kept as data URLs in memory and in storage, and are downloaded once per TTL.
+Sourcerer avatars, which are SVGs themselves, are kept with their faces
+embedded, and are revalidated with conditional requests.
+
+Entries in storage are overwritten when refreshed, and ones that are not
+refreshed anymore are deleted by cleanup().
+"""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import base64
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from os import path
+from urllib.error import HTTPError
+
+from . import http_client
+from . import storage
+from .cache import LRUCache
+
+
+class StorageTier:
+    """Cache entries kept in storage, one file per key, e.g. a URL."""
+    MAX_ENTRIES = 10000  # Max number of entries kept by cleanup().
+
+    def __init__(self, name, dir_name, max_age, max_entries=MAX_ENTRIES,
+                 key_field='url'):
+        """Creates a storage tier.
+
+        Args:
+          name: What is cached, for messages.
+          dir_name: Directory under storage.SYSTEM_DIR.
+          max_age: Seconds after which an entry not saved again is deleted.
+          max_entries: Max number of entries, the oldest ones are deleted.
+          key_field: Field of entries holding their key.
+        """
+        self.name = name
+        self.dir_name = dir_name
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.key_field = key_field
+        self.dir_made = False
+
+    def load(self, key):
+        entry_path = self._get_entry_path(key)
+        try:
+            if not storage.file_exists(entry_path):
+                return None
+            entry = json.loads(storage.load_file(entry_path))
+        except Exception as e:
+            print('w Failed to load cached %s %s: %s' % (self.name, key,
+                                                         str(e)))
+            return None
+
+        if entry.get(self.key_field) != key:
+            return None
+        return entry
+
+    def save(self, key, entry):
+        try:
+            if not self.dir_made:
+                storage.make_dirs(self._get_cache_dir())
+                self.dir_made = True
+            storage.save_file(self._get_entry_path(key), json.dumps(entry),
+                              'application/json')
+        except Exception as e:
+            print('w Failed to cache %s %s: %s' % (self.name, key, str(e)))
+
+    def cleanup(self):
+        """Deletes entries older than max_age, and the oldest ones over
+        max_entries. Times come from a directory listing, so the cost is
+        a listing and the deletes.
+        """
+        cache_dir = self._get_cache_dir()
+        if not storage.dir_exists(cache_dir):
+            return
+
+        # Newest first, so that entries over the limit are the oldest.
+        entries = sorted(((when, path.join(cache_dir, name))
+                          for name, when in storage.list_modified(cache_dir)),
+                         reverse=True)
+        oldest = datetime.utcnow() - timedelta(seconds=self.max_age)
+        stale = [entry_path for i, (when, entry_path) in enumerate(entries)
+                 if i >= self.max_entries or when < oldest]
+        storage.delete_files(stale)
+        print('i Deleted %d of %d cached %ss' % (len(stale), len(entries),
+                                                 self.name))
+
+    def _get_entry_path(self, key):
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return path.join(self._get_cache_dir(), name)
+
+    def _get_cache_dir(self):
+        return path.join(storage.SYSTEM_DIR, self.dir_name)
+
+
+class AvatarCache:
+    TTL = 24 * 3600                # Seconds to keep an avatar.
+    MAX_MEMORY = 64 * 1024 * 1024  # Max total size of data URLs in memory.
+
+    def __init__(self, ttl=TTL, max_memory=MAX_MEMORY):
+        self.ttl = ttl
+        self.memory = LRUCache(max_memory, ttl)
+        # Expired entries are of no use.
+        self.stored = StorageTier('avatar', 'avatars', ttl)
+
+    def get_data_url(self, url):
+        """Returns a data URL with the image, downloading it if needed."""
+        data_url = self.memory.get(url)
+        if data_url:
+            return data_url
+
+        entry = self.stored.load(url)
+        if not entry or entry['expires'] < time.time():
+            entry = self._download(url)
+            self.stored.save(url, entry)
+
+        data_url = entry['data_url']
+        ttl = max(0, entry['expires'] - time.time())
+        self.memory.put(url, data_url, size=len(data_url), ttl=ttl)
+        return data_url
+
+    def _download(self, url):
+        response = http_client.urlopen(url)
+        content_type = response.headers.get_content_type()
+        encoded = base64.b64encode(response.read()).decode()
+        print('i Downloaded avatar %s' % url)
+        return {'url': url,
+                'content_type': content_type,
+                'data_url': 'data:%s;base64,%s' % (content_type, encoded),
+                'expires': time.time() + self.ttl}
+
+
+class SourcererAvatarCache:
+    """Sourcerer avatar SVGs with faces embedded.
+
+    There is an avatar per Sourcerer user. Once the revalidation window
+    is over, an avatar is requested again with its ETag, and is only
+    downloaded and embedded again if it has changed.
+    """
+    REVALIDATE_AFTER = 6 * 3600     # Seconds to use an avatar as is.
+    MAX_MEMORY = 64 * 1024 * 1024   # Max total size of SVGs in memory.
+    MAX_STORED_AGE = 7 * 24 * 3600  # Seconds to keep an unused avatar.
+
+    def __init__(self, revalidate_after=REVALIDATE_AFTER,
+                 max_memory=MAX_MEMORY):
+        self.revalidate_after = revalidate_after
+        self.memory = LRUCache(max_memory)
+        # Expired entries are still good for revalidation, for a while.
+        self.stored = StorageTier('Sourcerer avatar', 'sourcerer_avatars',
+                                  SourcererAvatarCache.MAX_STORED_AGE)
+
+    def get_svg(self, url, embed):
+        """Returns an avatar SVG with its face embedded, and its version.
+
+        Args:
+          url: URL of a Sourcerer avatar.
+          embed: Function that takes downloaded SVG data and returns the SVG
+            with its face embedded, as a string.
+        Returns:
+          The SVG string, and a string that changes whenever the SVG does.
+        """
+        entry = self.memory.get(url)
+        if not entry:
+            entry = self.stored.load(url)
+
+        if not entry or entry['expires'] < time.time():
+            entry = self._revalidate(url, entry, embed)
+            self.stored.save(url, entry)
+
+        self.memory.put(url, entry, size=len(entry['svg']))
+        version = (entry.get('etag') or
+                   hashlib.sha1(entry['svg'].encode()).hexdigest())
+        return entry['svg'], version
+
+    def _revalidate(self, url, entry, embed):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        try:
+            response = http_client.urlopen(url, headers)
+        except HTTPError as e:
+            if e.code != 304 or not entry:
+                raise
+            return dict(entry, expires=time.time() + self.revalidate_after)
+
+        svg = embed(response.read())
+        print('i Downloaded Sourcerer avatar %s' % url)
+        return {'url': url,
+                'etag': response.headers.get('ETag'),
+                'svg': svg,
+                'expires': time.time() + self.revalidate_after}
+
+
+# Shared by all avatars made in a process.
+avatar_cache = AvatarCache()
+sourcerer_avatar_cache = SourcererAvatarCache()
+
+
+def cleanup():
+    """Deletes avatars not used for a while from storage."""
+    avatar_cache.stored.cleanup()
+    sourcerer_avatar_cache.stored.cleanup()
@@ -0,0 +1,78 @@
+"""In-process caches."""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache with expiration.
+
+    Every entry has a size, 1 by default, and the least recently used
+    entries are evicted when the total size goes over the limit.
+    """
+    def __init__(self, max_size, ttl=None):
+        """Creates a cache.
+
+        Args:
+          max_size: Max total size of entries.
+          ttl: Default time to live of an entry in seconds, None for forever.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.size = 0
+        self.entries = OrderedDict()  # key -> (value, size, expires).
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return default
+
+            value, _, expires = entry
+            if expires is not None and expires < time.time():
+                self._remove(key)
+                return default
+
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, size=1, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self.lock:
+            self._remove(key)
+            if size > self.max_size:
+                return
+
+            self.entries[key] = (value, size, expires)
+            self.size += size
+            while self.size > self.max_size:
+                self._remove(next(iter(self.entries)))
+
+    def remove(self, key):
+        with self.lock:
+            self._remove(key)
+
+    def remove_matching(self, predicate):
+        """Removes entries with keys matching a predicate."""
+        with self.lock:
+            for key in [k for k in self.entries if predicate(k)]:
+                self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.size -= entry[1]
@@ -0,0 +1,232 @@
+"""Commits via GitHub GraphQL API.
+
+A page of commits comes with authors and avatars in a single request, and
+checks for older commits of many authors are batched into a single request
+with aliases. Results have the shape of REST API results, so RepoTracker
+handles them the same way.
+"""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import json
+from datetime import datetime, timedelta
+
+from . import rate_limit
+
+GRAPHQL_URL = 'https://api.github.com/graphql'
+
+# Max number of commits per page, GitHub won't give more.
+MAX_PAGE_SIZE = 100
+
+# Max number of aliased queries in a request.
+MAX_ALIASES = 50
+
+RECENT_COMMITS_QUERY = '''
+query RecentCommits($owner: String!, $name: String!, $since: GitTimestamp!,
+                    $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef {
+      target {
+        ... on Commit {
+          history(first: $first, after: $after, since: $since) {
+            pageInfo { hasNextPage endCursor }
+            nodes {
+              oid
+              author { date user { id login avatarUrl } }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+'''
+
+USER_IDS_QUERY = '''
+query UserIds(%(params)s) {
+%(fields)s
+}
+'''
+USER_ID_FIELD = '  u%(i)d: user(login: $u%(i)d) { id }'
+
+HISTORY_BY_AUTHORS_QUERY = '''
+query HistoryByAuthors($owner: String!, $name: String!, $until: GitTimestamp!,
+                       %(params)s) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef {
+      target {
+        ... on Commit {
+%(fields)s
+        }
+      }
+    }
+  }
+}
+'''
+HISTORY_BY_AUTHOR_FIELD = (
+    '          a%(i)d: history(first: 1, until: $until, '
+    'author: {id: $a%(i)d}) { nodes { oid } }')
+
+
+class GraphQLError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+
+
+class GraphQLFetcher:
+    def __init__(self, token, url=GRAPHQL_URL, client=None):
+        """Creates a fetcher.
+
+        Args:
+          token: GitHub token, GraphQL API can't be used without one.
+          url: GraphQL API endpoint.
+          client: RateLimitedClient for the token, to share the budget.
+        """
+        if not token:
+            raise GraphQLError('GitHub token required for GraphQL API')
+        self.token = token
+        self.url = url
+        self.client = client or rate_limit.RateLimitedClient(token)
+        self.user_ids = {}  # GitHub username -> user node ID.
+
+    def get_commits(self, owner, name, since,
+                    stop_sha=None, per_page=MAX_PAGE_SIZE):
+        """Yields commits from newest to oldest, a page at a time.
+
+        Commits look like ones from GitHub REST API, with just the fields
+        RepoTracker uses. Commits by bots, or by email addresses not linked
+        to a GitHub user, have no author.
+
+        Args:
+          owner: GitHub repo owner.
+          name: GitHub repo name.
+          since: Datetime of the oldest commit.
+          stop_sha: Commit to stop at, neither it nor the following pages
+            are fetched.
+          per_page: Size of the first page, the following ones are max size.
+        """
+        variables = {'owner': owner, 'name': name,
+                     'since': _format_date(since)}
+        after = None
+        while True:
+            variables.update({'first': per_page, 'after': after})
+            data = self._query(RECENT_COMMITS_QUERY, variables)
+            target = self._get_target(data)
+            if not target:
+                return  # Empty repo.
+
+            history = target['history']
+            for node in history['nodes']:
+                commit = self._make_rest_commit(node)
+                if stop_sha and commit['sha'] == stop_sha:
+                    return
+                yield commit
+
+            page_info = history['pageInfo']
+            if not page_info['hasNextPage']:
+                return
+            after = page_info['endCursor']
+            per_page = MAX_PAGE_SIZE
+
+    def have_commits(self, owner, name, usernames, until):
+        """Checks which users have commits to a repo until a date.
+
+        Returns:
+          A dict of usernames to True if they have commits, False otherwise.
+        """
+        self._load_user_ids([u for u in usernames if u not in self.user_ids])
+
+        result = {u: False for u in usernames if not self.user_ids.get(u)}
+        known = [u for u in usernames if self.user_ids.get(u)]
+        for chunk in _chunks(known):
+            params = ', '.join('$a%d: ID!' % i for i in range(len(chunk)))
+            fields = '\n'.join(HISTORY_BY_AUTHOR_FIELD % {'i': i}
+                               for i in range(len(chunk)))
+            query = HISTORY_BY_AUTHORS_QUERY % {'params': params,
+                                                'fields': fields}
+
+            variables = {'owner': owner, 'name': name,
+                         'until': _format_date(until)}
+            for i, username in enumerate(chunk):
+                variables['a%d' % i] = self.user_ids[username]
+
+            target = self._get_target(self._query(query, variables))
+            for i, username in enumerate(chunk):
+                result[username] = bool(target and
+                                        target['a%d' % i]['nodes'])
+
+        return result
+
+    def _load_user_ids(self, usernames):
+        for chunk in _chunks(usernames):
+            params = ', '.join('$u%d: String!' % i for i in range(len(chunk)))
+            fields = '\n'.join(USER_ID_FIELD % {'i': i}
+                               for i in range(len(chunk)))
+            query = USER_IDS_QUERY % {'params': params, 'fields': fields}
+            variables = {'u%d' % i: u for i, u in enumerate(chunk)}
+
+            # Users that don't exist anymore come as errors and nulls.
+            data = self._query(query, variables, allow_errors=True)
+            for i, username in enumerate(chunk):
+                user = data.get('u%d' % i)
+                self.user_ids[username] = user['id'] if user else None
+
+    def _query(self, query, variables, allow_errors=False):
+        body = json.dumps({'query': query, 'variables': variables})
+        headers = {'Authorization': 'bearer %s' % self.token,
+                   'Content-Type': 'application/json'}
+        response = self.client.urlopen(self.url, headers, body.encode())
+        result = json.loads(response.read().decode())
+
+        errors = result.get('errors')
+        if errors and any(e.get('type') == 'RATE_LIMITED' for e in errors):
+            self.client.check(1, rate_limit.GRAPHQL)  # Raises if it can.
+        if errors and (not allow_errors or not result.get('data')):
+            messages = [e.get('message', str(e)) for e in errors]
+            raise GraphQLError('GraphQL error: %s' % '; '.join(messages))
+        return result['data']
+
+    def _get_target(self, data):
+        repository = data['repository']
+        if not repository:
+            raise GraphQLError('Repository not found')
+        branch = repository['defaultBranchRef']
+        return branch['target'] if branch else None
+
+    def _make_rest_commit(self, node):
+        author = node['author']
+        user = author['user'] if author else None
+        rest_author = None
+        if user:
+            self.user_ids[user['login']] = user['id']
+            rest_author = {'login': user['login'],
+                           'avatar_url': user['avatarUrl'],
+                           'type': 'User'}
+
+        date = _to_utc(author['date']) if author else None
+        return {'sha': node['oid'],
+                'author': rest_author,
+                'commit': {'author': {'date': date}}}
+
+
+def _chunks(items):
+    for i in range(0, len(items), MAX_ALIASES):
+        yield items[i:i + MAX_ALIASES]
+
+
+def _format_date(date):
+    return date.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _to_utc(timestamp):
+    """Converts a timestamp with a UTC offset to UTC, like in REST API."""
+    if timestamp.endswith('Z'):
+        return timestamp
+
+    date = datetime.strptime(timestamp[:19], '%Y-%m-%dT%H:%M:%S')
+    hours, minutes = timestamp[20:].split(':')
+    offset = timedelta(hours=int(hours), minutes=int(minutes))
+    if timestamp[19] == '-':
+        offset = -offset
+    return _format_date(date - offset)
@@ -3,6 +3,8 @@
 __author__ = 'Sergey Surkov'
 __copyright__ = '2018 Sourcerer, Inc'
 
+import calendar
+import gzip
 import json
 import re
 
@@ -10,13 +12,16 @@ from collections import namedtuple
 from datetime import datetime, timedelta
 from os import path
 from urllib.error import HTTPError
-from urllib.request import Request, urlopen
 
-import dateparser
 from google.protobuf import text_format
 
+from . import http_client
+from . import parallel
 from . import storage
 from . import repo_pb2 as pb
+from . import rate_limit
+from .github_graphql import GraphQLFetcher, GRAPHQL_URL
+from .rate_limit import RateLimitedClient, RateLimitError
 
 
 class TrackerError(Exception):
@@ -29,7 +34,140 @@ ListRepoResult = namedtuple(
     ['user', 'owner', 'repo', 'status', 'last_modified', 'error_message'])
 
 
+class CachedResponse:
+    """A GitHub response whose body has already been read."""
+    def __init__(self, body, headers):
+        self.body = body
+        self.headers = headers
+
+    def read(self):
+        return self.body
+
+
+class ResponseCache:
+    """Persistent cache of GitHub responses keyed by URL.
+
+    Responses are stored along with their ETag and Last-Modified validators,
+    so that the next request for the same URL can be made conditional.
+    GitHub doesn't count 304 responses against the rate limit.
+    """
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.used_urls = set()
+        self.dirty = False
+
+    def load(self):
+        self.entries = {}
+        self.used_urls = set()
+        self.dirty = False
+        if not storage.file_exists(self.cache_path):
+            return
+        try:
+            self.entries = json.loads(storage.load_file(self.cache_path))
+        except ValueError:
+            print('w Corrupt GitHub response cache %s' % self.cache_path)
+
+    def save(self):
+        """Saves the cache if any response was put since loading."""
+        if not self.dirty:
+            return
+
+        # Only keep what was used, URLs with dates in them never repeat.
+        entries = {url: entry for url, entry in self.entries.items()
+                   if url in self.used_urls}
+        storage.save_file(self.cache_path, json.dumps(entries))
+        self.dirty = False
+
+    def get_validators(self, url):
+        """Returns conditional request headers for a URL."""
+        entry = self.entries.get(url)
+        if not entry:
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def get(self, url):
+        """Returns a cached response for a URL, None if there is none."""
+        entry = self.entries.get(url)
+        if not entry:
+            return None
+
+        self.used_urls.add(url)
+        headers = {}
+        if entry.get('link'):
+            headers['Link'] = entry['link']
+        return CachedResponse(entry['body'].encode(), headers)
+
+    def put(self, url, response):
+        """Reads a response, caches it if possible, and returns its copy."""
+        body = response.read()
+        headers = {}
+        if 'Link' in response.headers:
+            headers['Link'] = response.headers['Link']
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.entries[url] = {'etag': etag,
+                                 'last_modified': last_modified,
+                                 'link': headers.get('Link'),
+                                 'body': body.decode()}
+            self.used_urls.add(url)
+            self.dirty = True
+
+        return CachedResponse(body, headers)
+
+
 class RepoTracker:
+    # Formats to save repos in, any of them can be loaded.
+    TEXT = 'text'                # Protobuf text format.
+    BINARY = 'binary'            # Protobuf wire format.
+    BINARY_GZIP = 'binary-gzip'  # Gzipped protobuf wire format.
+    FORMATS = [TEXT, BINARY, BINARY_GZIP]
+
+    save_format = TEXT
+
+    # GitHub APIs to fetch commits with, by name.
+    FETCHERS = {'rest': pb.Repo.REST, 'graphql': pb.Repo.GRAPHQL}
+
+    graphql_url = GRAPHQL_URL
+
+    # Index of all tracked repos, an entry object per repo under a dir per
+    # user, so that listing repos of a user takes a single listing, and
+    # concurrent updates of different repos never write the same object.
+    # Entries are always kept up to date, the marker tells the index has
+    # all repos, i.e. listing can trust it.
+    INDEX_DIR = path.join(storage.SYSTEM_DIR, 'repo_index')
+    INDEX_MARKER = 'complete'
+
+    # Commit page sizes. Refreshes start small, as there are usually just
+    # a few new commits, and pages grow if more are needed.
+    FIRST_PAGE_SIZE = 25
+    MAX_PAGE_SIZE = 100
+
+    # Requests an update takes besides probes for authors: commit pages and
+    # contributors, with headroom for a few authors not seen before. Updates
+    # are deferred if fewer requests are left until the rate limit resets.
+    BASE_UPDATE_COST = 10
+
+    @staticmethod
+    def set_save_format(save_format):
+        """Sets format for saving repos for all trackers."""
+        if save_format not in RepoTracker.FORMATS:
+            raise TrackerError('Invalid save format: %s' % save_format)
+        RepoTracker.save_format = save_format
+
+    @staticmethod
+    def set_graphql_url(url):
+        """Sets GitHub GraphQL API endpoint for all trackers."""
+        RepoTracker.graphql_url = url
+
     def configure(self, user, owner, repo,
                   sourcerer_api_origin=None,
                   sourcerer_api_secret=None,
@@ -53,6 +191,7 @@ class RepoTracker:
         self.owner = owner
         self.repo = repo
         self.github_token = github_token
+        self.response_cache = ResponseCache(self._get_response_cache_path())
         if not github_token and sourcerer_api_origin:
             if not sourcerer_api_secret:
                 raise TrackerError('Sourcerer API secret required')
@@ -60,16 +199,24 @@ class RepoTracker:
             self.github_token = self._load_github_token(
                 sourcerer_api_origin, sourcerer_api_secret)
 
+        self.github_client = RateLimitedClient(self.github_token)
+
     def error(self, message):
         raise TrackerError('%s %s' % (message, self._repo_str()))
 
-    def add(self):
+    def add(self, fetcher='rest'):
         """Adds a repo to track.
 
+        Args:
+          fetcher: GitHub API to fetch commits with, one of FETCHERS.
         """
+        if fetcher not in RepoTracker.FETCHERS:
+            raise TrackerError('Invalid fetcher: %s' % fetcher)
+
         repo_dir = self._get_repo_dir()
         storage.make_dirs(repo_dir)
-        repo = pb.Repo(owner=self.owner, name=self.repo, user=self.user)
+        repo = pb.Repo(owner=self.owner, name=self.repo, user=self.user,
+                       fetcher=RepoTracker.FETCHERS[fetcher])
 
         repo_path = self._get_repo_path()
         if storage.file_exists(repo_path):
@@ -92,17 +239,84 @@ class RepoTracker:
         user_dir = self._get_user_dir()
         if not storage.list_dir(user_dir):
             storage.remove_subtree(user_dir)
+
+        self._update_index(None)
         print('i Removed repo %s' % (self._repo_str()))
 
     @staticmethod
     def list(user=None):
-        """Returns all tracked GitHub repos."""
+        """Returns all tracked GitHub repos.
+
+        Repos are listed from the index, or from storage if there is none,
+        making the index on the way.
+        """
+        if not RepoTracker._has_index():
+            yield from RepoTracker._build_index(user)
+            return
+
+        keys = RepoTracker.list_keys(user)
+        entries = parallel.parallel_map(RepoTracker._load_index_entry, keys)
+        for entry in entries:
+            if not entry:
+                continue  # Removed since listed.
+            last_modified = datetime.strptime(entry['last_modified'],
+                                              '%Y-%m-%dT%H:%M:%SZ')
+            yield ListRepoResult(entry['user'], entry['owner'],
+                                 entry['repo'], entry['status'],
+                                 last_modified, entry['error_message'])
+
+    @staticmethod
+    def list_keys(user=None):
+        """Returns (user, owner, repo) of all tracked GitHub repos.
+
+        Takes a listing of the index per user, walks storage if there is
+        no index.
+        """
+        if not RepoTracker._has_index():
+            return sorted((r.user, r.owner, r.repo)
+                          for r in RepoTracker._build_index(user))
+
+        if user:
+            users = [user]
+        else:
+            users = storage.list_dir(RepoTracker.INDEX_DIR,
+                                     include_files=False)
+        names = parallel.parallel_map(RepoTracker._list_index_entries, users)
+        return sorted((u,) + tuple(name.split(':', 1))
+                      for u, user_names in zip(users, names)
+                      for name in user_names)
+
+    @staticmethod
+    def rebuild_index():
+        """Makes the index from scratch by walking storage."""
+        storage.remove_subtree(RepoTracker.INDEX_DIR)
+        num_repos = len(list(RepoTracker._build_index()))
+        print('i Indexed %d repos' % num_repos)
+
+    @staticmethod
+    def _build_index(user=None):
+        """Yields repos from storage, adding them to the index. The index
+        is marked complete once all users are walked.
+        """
+        for result in RepoTracker._list_storage(user):
+            RepoTracker._save_index_entry(result)
+            yield result
+
+        if not user:
+            storage.make_dirs(RepoTracker.INDEX_DIR)
+            storage.save_file(
+                path.join(RepoTracker.INDEX_DIR, RepoTracker.INDEX_MARKER),
+                '', 'text/plain')
+
+    @staticmethod
+    def _list_storage(user=None):
         if user:
             if not storage.dir_exists(user):
                 return
             users = [user]
         else:
-            users = storage.list_dir('', include_files=False)
+            users = [u for u in storage.list_dir('', include_files=False)
+                     if u != storage.SYSTEM_DIR]
 
         for user in users:
             for owner in storage.list_dir(user):
@@ -124,9 +338,44 @@ class RepoTracker:
 
         return repo
 
+    def convert(self):
+        """Saves a repo again in the current save format."""
+        self._save(self.load())
+        print('i Converted repo %s to %s' % (self._repo_str(),
+                                            RepoTracker.save_format))
+
+    def set_fetcher(self, fetcher):
+        """Sets GitHub API to fetch commits with, one of FETCHERS."""
+        if fetcher not in RepoTracker.FETCHERS:
+            raise TrackerError('Invalid fetcher: %s' % fetcher)
+
+        repo = self.load()
+        repo.fetcher = RepoTracker.FETCHERS[fetcher]
+        self._save(repo)
+        print('i Set fetcher of repo %s to %s' % (self._repo_str(), fetcher))
+
     def update(self):
+        """Updates a repo, unless the GitHub token is out of budget."""
         repo = self.load()
+        self.github_client.load()
+        try:
+            self.github_client.check(self._estimate_update_cost(repo))
+            if repo.fetcher == pb.Repo.GRAPHQL:
+                self.github_client.check(RepoTracker.BASE_UPDATE_COST,
+                                         rate_limit.GRAPHQL)
+        except RateLimitError as e:
+            print('w Deferred update of repo %s: %s' % (self._repo_str(),
+                                                         str(e)))
+            return
+
+        self.response_cache.load()
         try:
+            self.graphql = None
+            if repo.fetcher == pb.Repo.GRAPHQL:
+                self.graphql = GraphQLFetcher(self.github_token,
+                                              RepoTracker.graphql_url,
+                                              self.github_client)
+
             avatars = dict(repo.avatars)
             self._update_latest_commits(repo, avatars)
             self._update_top_contributors(repo, avatars)
@@ -140,24 +389,71 @@ class RepoTracker:
             repo.ClearField('error_message')
 
             self._save(repo)
+            self.response_cache.save()
             print('i Updated repo %s' % self._repo_str())
 
+        except RateLimitError as e:
+            # Repo is left as it was, to be updated once the limit resets.
+            # Responses fetched so far are kept, so they cost nothing then.
+            self.response_cache.save()
+            print('w Deferred update of repo %s: %s' % (self._repo_str(),
+                                                         str(e)))
         except Exception as e:
             repo.status = pb.Repo.ERROR
             repo.error_message = str(e)
             self._save(repo)
             print('e Error updating repo %s: %s' % (self._repo_str(), str(e)))
+        finally:
+            self.github_client.save()
+
+    @staticmethod
+    def _estimate_update_cost(repo):
+        """Estimates the number of REST requests an update of a repo takes.
+
+        With REST, every recent author without a known first commit takes
+        a request of its own. Authors of new commits are not known yet, and
+        are checked for once the commits are fetched.
+        """
+        cost = RepoTracker.BASE_UPDATE_COST
+        if repo.fetcher != pb.Repo.GRAPHQL:
+            authors = {c.username for c in repo.recent_commits}
+            cost += len([u for u in authors if u not in repo.first_commits])
+        return cost
 
     @staticmethod
     def _load_repo(repo_path):
         if not storage.file_exists(repo_path):
             return None
 
+        return RepoTracker._parse_repo(storage.load_bytes(repo_path))
+
+    @staticmethod
+    def _parse_repo(data):
+        """Parses a repo saved in any of the formats."""
+        if data[:2] == b'\x1f\x8b':  # Gzip magic.
+            data = gzip.decompress(data)
+
+        # Text is tried first, as wire format never parses as text, while
+        # text could parse as wire format, with garbage in unknown fields.
         repo = pb.Repo()
-        text_format.Merge(storage.load_file(repo_path), repo)
+        try:
+            text_format.Merge(data.decode(), repo)
+        except (UnicodeDecodeError, text_format.ParseError):
+            repo.Clear()
+            repo.ParseFromString(data)
 
         return repo
 
+    @staticmethod
+    def _serialize_repo(repo):
+        if RepoTracker.save_format == RepoTracker.TEXT:
+            return text_format.MessageToString(repo).encode()
+
+        data = repo.SerializeToString()
+        if RepoTracker.save_format == RepoTracker.BINARY_GZIP:
+            data = gzip.compress(data)
+        return data
+
     def _repo_str(self):
         return '%s:%s/%s' % (self.user, self.owner, self.repo)
 
@@ -167,8 +463,7 @@ class RepoTracker:
             args = 'username=%s&provider=github' % self.user
             url = '%s/%s?%s' % (sourcerer_api_origin, PATH, args)
             headers = {'Authorization': sourcerer_api_secret}
-            request = Request(url, None, headers=headers)
-            response = urlopen(request)
+            response = http_client.urlopen(url, headers)
             data = self._get_json(response)
             return data['token']
         except HTTPError as e:
@@ -187,9 +482,75 @@ class RepoTracker:
     def _get_user_dir(self):
         return self.user
 
+    def _get_response_cache_path(self):
+        return path.join(self._get_repo_dir(), 'github_cache')
+
     def _save(self, repo):
         repo_path = self._get_repo_path()
-        storage.save_file(repo_path, text_format.MessageToString(repo))
+        storage.save_bytes(repo_path, RepoTracker._serialize_repo(repo))
+        self._update_index(repo)
+
+    def _update_index(self, repo):
+        """Updates or removes, if repo is None, the repo's index entry."""
+        try:
+            if repo:
+                RepoTracker._save_index_entry(
+                    ListRepoResult(self.user, self.owner, self.repo,
+                                   repo.status, datetime.utcnow(),
+                                   repo.error_message))
+            else:
+                storage.delete_files([RepoTracker._get_index_entry_path(
+                    self.user, self.owner, self.repo)])
+        except Exception as e:
+            # Not fatal, the index can always be rebuilt.
+            print('w Failed to update index for %s: %s' % (self._repo_str(),
+                                                           str(e)))
+
+    @staticmethod
+    def _has_index():
+        return storage.file_exists(
+            path.join(RepoTracker.INDEX_DIR, RepoTracker.INDEX_MARKER))
+
+    @staticmethod
+    def _list_index_entries(user):
+        """Returns names, i.e. owner:repo, of index entries of a user."""
+        user_dir = path.join(RepoTracker.INDEX_DIR, user)
+        if not storage.dir_exists(user_dir):
+            return []
+        return storage.list_dir(user_dir, include_subdirs=False)
+
+    @staticmethod
+    def _load_index_entry(key):
+        entry_path = RepoTracker._get_index_entry_path(*key)
+        try:
+            return json.loads(storage.load_file(entry_path))
+        except Exception:
+            return None
+
+    @staticmethod
+    def _save_index_entry(result):
+        entry_path = RepoTracker._get_index_entry_path(
+            result.user, result.owner, result.repo)
+        storage.make_dirs(path.dirname(entry_path))
+        storage.save_file(entry_path,
+                          json.dumps(RepoTracker._make_index_entry(result)),
+                          'application/json')
+
+    @staticmethod
+    def _get_index_entry_path(user, owner, repo):
+        # GitHub names have no colons.
+        return path.join(RepoTracker.INDEX_DIR, user,
+                         '%s:%s' % (owner, repo))
+
+    @staticmethod
+    def _make_index_entry(result):
+        return {'user': result.user,
+                'owner': result.owner,
+                'repo': result.repo,
+                'status': result.status,
+                'last_modified': result.last_modified.strftime(
+                    '%Y-%m-%dT%H:%M:%SZ'),
+                'error_message': result.error_message}
 
     def _update_latest_commits(self, repo, avatars):
         """Makes sure repo contains 7 days worth of most recent commits."""
@@ -198,13 +559,26 @@ class RepoTracker:
         commits = []
         now = datetime.utcnow()
         since = now - timedelta(days=7)
-        for c in self._get_github_commits(repo.owner, repo.name, since=since):
+
+        # Ask from the start of the day to keep the URL, and so its cached
+        # response, stable for a day. Extra commits are trimmed below.
+        since_day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        per_page = (RepoTracker.FIRST_PAGE_SIZE if last_known
+                    else RepoTracker.MAX_PAGE_SIZE)
+        if self.graphql:
+            github_commits = self.graphql.get_commits(
+                repo.owner, repo.name, since_day,
+                stop_sha=last_known, per_page=per_page)
+        else:
+            github_commits = self._get_github_commits(
+                repo.owner, repo.name, since=since_day,
+                stop_sha=last_known, per_page=per_page)
+
+        for c in github_commits:
             if 'sha' not in c:
                 print('w GitHub commit without hash. Weird. Skipping')
                 continue
             sha = c['sha']
-            if sha == last_known:
-                break
 
             try:
                 author = c['author']['login']
@@ -218,14 +592,24 @@ class RepoTracker:
                 commit_date = c['commit']['author']['date'][:-1]
 
                 commit = pb.Commit(
-                    sha=sha, timestamp=commit_date, username=author)
+                    sha=sha, timestamp=commit_date, username=author,
+                    epoch=self._parse_timestamp(commit_date))
                 commits.append(commit)
             except:
                 print('w Author, date, or avatar missing. Skipping %s' % sha)
 
         # We need to keep just last week's worth of commits.
+        for commit in repo.recent_commits:
+            if not commit.epoch:
+                commit.epoch = self._parse_timestamp(commit.timestamp)
         commits.extend(repo.recent_commits)
-        while commits and dateparser.parse(commits[-1].timestamp) < since:
+
+        # Commits are in GitHub order, which the first of them relies on
+        # to stop fetching next time. It is not by author date, e.g.
+        # rebased commits keep their old dates, so older commits are only
+        # trimmed from the end.
+        since_epoch = calendar.timegm(since.timetuple())
+        while commits and commits[-1].epoch < since_epoch:
             commits.pop()
 
         repo.ClearField('recent_commits')
@@ -256,47 +640,103 @@ class RepoTracker:
             avatars[username] = contrib['avatar_url']
 
     def _update_new_contributors(self, repo):
+        """Finds contributors who made their first commit in the last week.
+
+        First commit times are kept in the repo, so GitHub is only asked
+        about usernames that have never been seen in recent commits before.
+        """
         repo.ClearField('new_contributors')
         if not repo.recent_commits:
             return
 
         now = datetime.utcnow()
         until = now - timedelta(days=7)
-        everyone = {c.username for c in repo.recent_commits}
-        new_contributors = set()
-        for username in everyone:
-            commit = next(self._get_github_commits(repo.owner, repo.name,
-                                                   author=username,
-                                                   until=until), None)
-            if not commit:
-                new_contributors.add(username)
 
-        repo.new_contributors.extend(list(new_contributors))
+        earliest_commits = {}
+        for c in repo.recent_commits:
+            earliest_commits[c.username] = min(
+                earliest_commits.get(c.username, c.epoch), c.epoch)
+
+        unknown = [u for u in earliest_commits if u not in repo.first_commits]
+        if self.graphql:
+            have_commits = self.graphql.have_commits(
+                repo.owner, repo.name, unknown, until)
+            has_old_commits = [have_commits[u] for u in unknown]
+        else:
+            # Authors new to the repo are only known once commits are in,
+            # check again before probing each of them.
+            self.github_client.check(len(unknown))
+            has_old_commits = parallel.parallel_map(
+                lambda u: self._has_github_commits(repo, u, until), unknown)
+        for username, has_old in zip(unknown, has_old_commits):
+            repo.first_commits[username] = (0 if has_old
+                                            else earliest_commits[username])
+
+        until_timestamp = calendar.timegm(until.timetuple())
+        new_contributors = [u for u in earliest_commits
+                            if repo.first_commits[u] >= until_timestamp]
+        repo.new_contributors.extend(new_contributors)
+
+    def _has_github_commits(self, repo, author, until):
+        # Probes are never repeated, as until is down to seconds.
+        commit = next(self._get_github_commits(repo.owner, repo.name,
+                                               author=author, until=until,
+                                               per_page=1, cacheable=False),
+                      None)
+        return commit is not None
 
     def _get_github_commits(self, owner, repo,
-                            author=None, since=None, until=None):
-        url = self._make_github_url(owner, repo, 'commits')
-        args = ['per_page=100']
+                            author=None, since=None, until=None,
+                            stop_sha=None, per_page=MAX_PAGE_SIZE,
+                            cacheable=True):
+        """Yields commits from newest to oldest, a page at a time.
+
+        Args:
+          stop_sha: Commit to stop at, neither it nor the following pages
+            are fetched.
+          per_page: Size of the first page, the following ones grow.
+          cacheable: Whether to keep responses in the response cache.
+        """
+        base_url = self._make_github_url(owner, repo, 'commits')
+        args = []
         if author:
             args.append('author=' + author)
         if since:
             args.append('since=' + self._format_date(since))
         if until:
             args.append('until=' + self._format_date(until))
-        if args:
-            url += '?' + '&'.join(args)
-
-        last_url = None
-        while url:
-            r = self._open_github_url(url)
-            if url != last_url:
-                url, last_url = self._get_next_last_url(r.headers)
-            else:
-                url = None
+
+        page = 1
+        num_fetched = 0
+        while True:
+            page_args = ['per_page=%d' % per_page, 'page=%d' % page]
+            url = base_url + '?' + '&'.join(page_args + args)
+            r = self._open_github_url(url, cacheable)
             data = self._get_json(r)
             for commit in data:
+                if stop_sha and commit.get('sha') == stop_sha:
+                    return
                 yield commit
 
+            next_url, _ = self._get_next_last_url(r.headers)
+            if not next_url or len(data) < per_page:
+                return
+            num_fetched += len(data)
+            per_page, page = self._get_next_page(num_fetched, per_page)
+
+    @staticmethod
+    def _get_next_page(num_fetched, per_page):
+        """Returns page size and number for commits after num_fetched.
+
+        Page size doubles as long as pages stay aligned with commits fetched
+        so far, e.g. 25 commits per page 1, 25 per page 2, 50 per page 2,
+        100 per page 2, 100 per page 3.
+        """
+        grown = min(per_page * 2, RepoTracker.MAX_PAGE_SIZE)
+        if num_fetched % grown == 0:
+            per_page = grown
+        return per_page, num_fetched // per_page + 1
+
     def _is_bot(self, github_user_json):
         author = github_user_json['login']
         author_type = github_user_json['type']
@@ -315,6 +755,11 @@ class RepoTracker:
     def _format_date(self, date):
         return date.strftime('%Y-%m-%dT%H:%M:%SZ')
 
+    def _parse_timestamp(self, timestamp):
+        """Converts commit timestamp to seconds since epoch."""
+        date = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S')
+        return calendar.timegm(date.timetuple())
+
     def _get_next_last_url(self, headers):
         if 'Link' not in headers:
             return None, None
@@ -327,18 +772,26 @@ class RepoTracker:
     def _make_github_url(self, owner, repo, what):
         return 'https://api.github.com/repos/%s/%s/%s' % (owner, repo, what)
 
-    def _open_github_url(self, url):
+    def _open_github_url(self, url, cacheable=True):
         try:
-            headers = {}
+            headers = (self.response_cache.get_validators(url) if cacheable
+                       else {})
             if self.github_token:
                 headers['Authorization'] = 'token %s' % self.github_token
-            request = Request(url, None, headers=headers)
-            return urlopen(request)
+            response = self.github_client.urlopen(url, headers)
         except HTTPError as e:
+            if e.code == 304:
+                cached = self.response_cache.get(url)
+                if cached:
+                    return cached
             if e.code == 403:
                 print('e %s. GitHub API rate limit?' % e.reason)
             raise
 
+        if not cacheable:
+            return response
+        return self.response_cache.put(url, response)
+
     def _get_json(self, response):
         data = response.read().decode()
         return json.loads(data)
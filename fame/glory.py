@@ -3,13 +3,25 @@
 __author__ = 'Sergey Surkov'
 __copyright__ = '2018 Sourcerer, Inc'
 
+import gzip
+import hashlib
 import json
 import io
 from os import path
-from urllib.request import urlopen
 
+from . import avatar_cache
+from . import http_client
+from . import parallel
+from . import scheduler
 from . import storage
+from . import svg_render
 from .avatar import AvatarAdorner, Spacer
+from .user_mapping import user_mapping_cache
+
+
+class GloryError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
 
 
 class Glory:
@@ -19,23 +31,79 @@ class Glory:
 
     LEGEND_URL = 'https://github.com/sourcerer-io/hall-of-fame'
 
-    def __init__(self, sourcerer_origin, sourcerer_api_origin=None):
+    # Bump to re-render all halls of fame, e.g. when images change.
+    RENDER_VERSION = 1
+
+    # Images change at most once per refresh, so caches, e.g. GitHub's
+    # image proxy, may keep them for a part of the refresh period.
+    CACHE_CONTROL = 'public, max-age=%d' % (scheduler.REFRESH_PERIOD // 4)
+
+    # Kinds of image slots.
+    AVATAR = 'avatar'
+    LEGEND = 'legend'
+    EMPTY = 'empty'
+
+    # Install modes: write to a temp dir and move files in place, or write
+    # files in place directly, each of them atomically. Neither is atomic
+    # as a whole: readers of images and links by their paths may see some
+    # of them from the previous install for a while, more so in direct
+    # mode, which halves writes. The manifest always goes last.
+    TEMP_INSTALL = 'temp'
+    DIRECT_INSTALL = 'direct'
+    INSTALL_MODES = [TEMP_INSTALL, DIRECT_INSTALL]
+
+    # Outputs: an image and a link per slot, one SVG with all entries
+    # linked, for embedding in HTML, or both.
+    SLOTS_OUTPUT = 'slots'
+    BUNDLE_OUTPUT = 'bundle'
+    ALL_OUTPUT = 'all'
+    OUTPUTS = [SLOTS_OUTPUT, BUNDLE_OUTPUT, ALL_OUTPUT]
+
+    BUNDLE_HEIGHT = 90  # Pixels, same as slot images.
+    BUNDLE_GAP = 4      # Pixels between entries of a bundle.
+
+    def __init__(self, sourcerer_origin, sourcerer_api_origin=None,
+                 install_mode=TEMP_INSTALL, compress=False,
+                 output=SLOTS_OUTPUT):
         """Creates an instance of Glory.
 
         Args:
           sourcerer_origin: Origin for Sourcerer URLs, e.g. avatars.
           sourcerer_api_origin: Origin for Sourcerer API.
+          install_mode: One of INSTALL_MODES.
+          compress: Whether to save images gzipped, for serving with gzip
+            content encoding.
+          output: One of OUTPUTS.
         """
+        if install_mode not in Glory.INSTALL_MODES:
+            raise GloryError('Invalid install mode: %s' % install_mode)
+        if output not in Glory.OUTPUTS:
+            raise GloryError('Invalid output: %s' % output)
+
         self.sourcerer_origin = sourcerer_origin
         self.sourcerer_api_origin = sourcerer_api_origin
         if not self.sourcerer_api_origin:
             self.sourcerer_api_origin = self.sourcerer_origin
+        self.use_temp = install_mode == Glory.TEMP_INSTALL
+        self.compress = compress
+        self.output = output
+        self.issued = []  # Paths of files saved by the last make.
         self.user_mapping = {}
 
-    def make(self, repo):
-        """Makes hall of fame for a repo, a protobuf."""
+        # Legend and empty images are the same for all repos.
+        spacer = Spacer()
+        spacer.make_legend()
+        self.legend_svg = spacer.get_spacer_svg()
+        spacer.make_empty()
+        self.empty_svg = spacer.get_spacer_svg()
+
+    def make(self, repo, force=False):
+        """Makes hall of fame for a repo, a protobuf.
+
+        Nothing is rendered if entries are the same as last time, unless
+        forced.
+        """
         self.repo = repo
-        self._cleanup()
 
         trending, new_faces = self._assign_trending_and_new()
 
@@ -44,7 +112,27 @@ class Glory:
             excluded_users = set([v[0] for v in trending + new_faces])
             top_guns = self._assign_top(excluded_users)
 
-        self._issue_badges(trending, new_faces, top_guns)
+        everyone = ([(u, n, 'new') for u, n in new_faces] +
+                    [(u, n, 'trending') for u, n in trending] +
+                    [(u, n, 'top') for u, n in top_guns])
+        self._map_users_to_sourcerer([u for u, _, _, in everyone])
+
+        installed = self._load_manifest()
+        fingerprint = self._make_fingerprint(everyone)
+        if not force and fingerprint == installed.get('fingerprint'):
+            print('i Unchanged %s:%s/%s' % (repo.user, repo.owner, repo.name))
+            return
+
+        self._cleanup()
+        issued = self._issue_badges(everyone, {} if force else installed)
+
+        # Version changes with every install, so that caches can tell.
+        manifest = {'version': installed.get('version', 0) + 1,
+                    'fingerprint': fingerprint,
+                    'output': self.output,
+                    'compressed': self.compress}
+        manifest.update(issued)
+        self._save_manifest(manifest)
         self._install()
         print('i Glorified %s:%s/%s' % (repo.user, repo.owner, repo.name))
 
@@ -87,53 +175,134 @@ class Glory:
         top_guns.sort(key=lambda v: v[1], reverse=True)
         return top_guns
 
-    def _issue_badges(self, trending, new_faces, top_guns):
-        everyone = ([(u, n, 'new') for u, n in new_faces] +
-                    [(u, n, 'trending') for u, n in trending] +
-                    [(u, n, 'top') for u, n in top_guns])
-        self._map_users_to_sourcerer([u for u, _, _, in everyone])
+    def _issue_badges(self, everyone, installed):
+        """Saves images and links, or a bundle of them, as per output.
 
-        # Generate badges.
-        profile_urls = []
-        for i, entry in enumerate(everyone):
-            username, num_commits, badge = entry
-
-            adorner = AvatarAdorner()
-            sourcerer_user, sourcerer_url = self._map_to_sourcerer(username)
-            if sourcerer_url:
-                adorner.init_with_sourcerer(sourcerer_url)
-                profile_urls.append(
-                    'https://sourcerer.io/' + sourcerer_user)
-            else:
-                adorner.init_with_face(self.repo.avatars[username])
-                profile_urls.append('https://github.com/' + username)
+        Images are not saved if the installed ones are the same, as per
+        hashes in the installed manifest, so that they keep their ETags.
 
-            adorner.adorn(badge, num_commits)
-            self._save_svg(i, adorner.get_avatar_svg())
+        Returns:
+          Manifest entries: kinds and hashes of slot images, and the hash
+          of the bundle.
+        """
+        if installed.get('compressed', False) != self.compress:
+            installed = {}
 
-        # Make a legend image and a link.
-        spacer = Spacer()
-        spacer.make_legend()
-        self._save_svg(len(everyone), spacer.get_spacer_svg())
-        profile_urls.append(Glory.LEGEND_URL)
+        # Generate badges, downloading avatars in parallel.
+        avatars = parallel.parallel_map(self._make_avatar, everyone)
+        svgs = []
+        profile_urls = []
+        slots = []
+        for avatar_svg, profile_url in avatars:
+            svgs.append(avatar_svg)
+            profile_urls.append(profile_url)
+            slots.append(Glory.AVATAR)
 
+        # Make a legend image and a link.
         # Fill up the remaining slots with empty SVGs.
-        spacer.make_empty()
-        for i in range(len(everyone) + 1, Glory.MAX_ALL + 1):  # +1 for legend.
-            self._save_svg(i, spacer.get_spacer_svg())
+        for i in range(len(everyone), Glory.MAX_ALL + 1):  # +1 for legend.
+            slot = Glory.LEGEND if i == len(everyone) else Glory.EMPTY
+            svg = self.legend_svg if slot == Glory.LEGEND else self.empty_svg
+            svgs.append(svg)
             profile_urls.append(Glory.LEGEND_URL)
+            slots.append(slot)
+
+        files = []
+        issued = {}
+        if self.output != Glory.BUNDLE_OUTPUT:
+            issued['slots'] = slots
+            issued['hashes'] = self._add_slot_files(
+                files, svgs, profile_urls, installed.get('hashes', []))
+
+        if self.output != Glory.SLOTS_OUTPUT:
+            # Empty slots only keep integration code the same size.
+            entries = [(svg, url) for svg, url, slot in
+                       zip(svgs, profile_urls, slots) if slot != Glory.EMPTY]
+            bundle = svg_render.make_bundle(
+                [svg for svg, _ in entries], [url for _, url in entries],
+                Glory.BUNDLE_HEIGHT, Glory.BUNDLE_GAP)
+            data = bundle.encode()
+            issued['bundle_hash'] = hashlib.sha1(data).hexdigest()
+            if issued['bundle_hash'] != installed.get('bundle_hash'):
+                bundle_path = self._get_bundle_file_path(temp=self.use_temp)
+                files.append(self._make_svg_file(bundle_path, data))
+
+        storage.save_files(files)
+        self.issued = [file[0] for file in files]
+        return issued
+
+    def _add_slot_files(self, files, svgs, profile_urls, installed_hashes):
+        """Adds files of slot images and links, returns image hashes."""
+        hashes = []
+        for i, svg in enumerate(svgs):
+            data = svg.encode()
+            data_hash = hashlib.sha1(data).hexdigest()
+            hashes.append(data_hash)
+            if i >= len(installed_hashes) or installed_hashes[i] != data_hash:
+                image_path = self._get_image_file_path(i, temp=self.use_temp)
+                files.append(self._make_svg_file(image_path, data))
 
         # Save the profile link file.
-        link_path = self._get_link_file_path(temp=True)
-        storage.save_file(link_path, '\n'.join(profile_urls) + '\n')
+        link_path = self._get_link_file_path(temp=self.use_temp)
+        links = '\n'.join(profile_urls) + '\n'
+        files.append((link_path, links, 'text/plain'))
 
         # Generate a test HTML.
         f = io.StringIO()
         for i in range(len(profile_urls)):
             h = '<a href="%s"><img src="images/%d.svg"></a>'
             f.write(h % (profile_urls[i], i))
-        test_html_path = self._get_test_html_path(temp=True)
-        storage.save_file(test_html_path, f.getvalue(), 'text/html')
+        test_html_path = self._get_test_html_path(temp=self.use_temp)
+        files.append((test_html_path, f.getvalue(), 'text/html'))
+        return hashes
+
+    def _make_fingerprint(self, everyone):
+        """Makes a hash of everything that goes into the images."""
+        # Sourcerer avatar URLs stay the same when avatars change, so
+        # their versions go in too, revalidating them if due.
+        sourcerer_urls = [self._map_to_sourcerer(username)[1]
+                          for username, _, _ in everyone]
+        versions = parallel.parallel_map(
+            lambda url: url and AvatarAdorner.get_sourcerer_version(url),
+            sourcerer_urls)
+
+        entries = []
+        for (username, num_commits, badge), sourcerer_url, version in zip(
+                everyone, sourcerer_urls, versions):
+            avatar = sourcerer_url or self.repo.avatars[username]
+            entries.append([username, num_commits, badge, avatar, version])
+
+        data = json.dumps([Glory.RENDER_VERSION, self.compress, self.output,
+                           entries])
+        return hashlib.sha1(data.encode()).hexdigest()
+
+    def _load_manifest(self):
+        """Loads manifest of the installed hall of fame."""
+        manifest_path = self._get_manifest_path(temp=False)
+        if not storage.file_exists(manifest_path):
+            return {}
+        return json.loads(storage.load_file(manifest_path))
+
+    def _save_manifest(self, manifest):
+        manifest_path = self._get_manifest_path(temp=self.use_temp)
+        storage.save_file(manifest_path, json.dumps(manifest),
+                          'application/json')
+
+    def _make_avatar(self, entry):
+        """Makes an adorned avatar, returns its SVG and profile URL."""
+        username, num_commits, badge = entry
+
+        adorner = AvatarAdorner()
+        sourcerer_user, sourcerer_url = self._map_to_sourcerer(username)
+        if sourcerer_url:
+            adorner.init_with_sourcerer(sourcerer_url)
+            profile_url = 'https://sourcerer.io/' + sourcerer_user
+        else:
+            adorner.init_with_face(self.repo.avatars[username])
+            profile_url = 'https://github.com/' + username
+
+        adorner.adorn(badge, num_commits)
+        return adorner.get_avatar_svg(), profile_url
 
     def _count_commits(self):
         contributors = {}
@@ -146,10 +315,15 @@ class Glory:
         return contributors
 
     def _map_users_to_sourcerer(self, github_usernames):
-        url = self._get_sourcerer_mapping_url(github_usernames)
-        data = urlopen(url).read().decode()
-        parsed = json.loads(data)
-        self.user_mapping = {k: v for k, v in parsed.items() if v}
+        mapping, misses = user_mapping_cache.lookup(github_usernames)
+        if misses:
+            url = self._get_sourcerer_mapping_url(misses)
+            data = http_client.urlopen(url).read().decode()
+            parsed = json.loads(data)
+            fetched = {u: parsed.get(u) or None for u in misses}
+            user_mapping_cache.store(fetched)
+            mapping.update(fetched)
+        self.user_mapping = {k: v for k, v in mapping.items() if v}
 
     def _map_to_sourcerer(self, github_username):
         if github_username not in self.user_mapping:
@@ -167,14 +341,26 @@ class Glory:
         return '%s/assets/avatar/%s' % (self.sourcerer_origin,
                                         sourcerer_username)
 
-    def _save_svg(self, num, svg):
-        image_path = self._get_image_file_path(num, temp=True)
-        storage.save_file(image_path, svg, 'image/svg+xml')
+    def _make_svg_file(self, image_path, data):
+        encoding = None
+        if self.compress:
+            data = _gzip(data)
+            encoding = 'gzip'
+        return (image_path, data, 'image/svg+xml', encoding,
+                Glory.CACHE_CONTROL)
 
     def _cleanup(self):
+        with_images = self.output != Glory.BUNDLE_OUTPUT
+        if not self.use_temp:
+            if with_images:
+                storage.make_dirs(self._get_image_dir(temp=False))
+            return
+
         temp_dir = self._get_base_dir(temp=True)
         storage.remove_subtree(temp_dir)
         storage.make_dirs(temp_dir)
+        if not with_images:
+            return
 
         temp_image_dir = self._get_image_dir(temp=True)
         storage.make_dirs(temp_image_dir)
@@ -183,31 +369,36 @@ class Glory:
         storage.make_dirs(image_dir)
 
     def _install(self):
+        if not self.use_temp:
+            return  # Everything is in place, manifest written last.
+
         # Never delete anything from base dir so that serving never fails.
         # Since we always make the same number of entries, we simply overwrite.
-        temp_image_dir = self._get_image_dir(temp=True)
-        image_dir = self._get_image_dir(temp=False)
-
-        for filename in storage.list_dir(temp_image_dir):
-            storage.move_file(path.join(temp_image_dir, filename),
-                              path.join(image_dir, filename))
-
-        temp_link_file = self._get_link_file_path(temp=True)
-        link_file = self._get_link_file_path(temp=False)
-        storage.move_file(temp_link_file, link_file)
+        temp_dir = self._get_base_dir(temp=True)
+        base_dir = self._get_base_dir(temp=False)
+        moves = [(issued_path,
+                  path.join(base_dir, path.relpath(issued_path, temp_dir)))
+                 for issued_path in self.issued]
+        storage.move_files(moves)
 
-        temp_html_file = self._get_test_html_path(temp=True)
-        html_file = self._get_test_html_path(temp=False)
-        storage.move_file(temp_html_file, html_file)
+        # Manifest goes last, so that a failed install is redone.
+        storage.move_files([(self._get_manifest_path(temp=True),
+                             self._get_manifest_path(temp=False))])
 
         storage.remove_subtree(self._get_base_dir(temp=True))
 
     def _get_link_file_path(self, temp=False):
         return path.join(self._get_base_dir(temp), 'links.txt')
 
+    def _get_manifest_path(self, temp=False):
+        return path.join(self._get_base_dir(temp), 'manifest.json')
+
     def _get_test_html_path(self, temp=False):
         return path.join(self._get_base_dir(temp), 'test.html')
 
+    def _get_bundle_file_path(self, temp=False):
+        return path.join(self._get_base_dir(temp), 'bundle.svg')
+
     def _get_image_file_path(self, num, temp=False):
         return path.join(self._get_image_dir(temp), '%d.svg' % num)
 
@@ -217,3 +408,17 @@ class Glory:
     def _get_base_dir(self, temp):
         repo_dir = path.join(self.repo.user, self.repo.owner, self.repo.name)
         return path.join(repo_dir, 'temp') if temp else repo_dir
+
+
+def cleanup_caches():
+    """Deletes cached avatars and user mappings not used for a while."""
+    avatar_cache.cleanup()
+    user_mapping_cache.stored.cleanup()
+
+
+def _gzip(data):
+    """Gzips data, the same data always gives the same result."""
+    f = io.BytesIO()
+    with gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as gz:
+        gz.write(data)
+    return f.getvalue()
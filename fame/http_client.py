@@ -0,0 +1,157 @@
+"""HTTP client keeping connections alive between requests.
+
+TLS handshakes with GitHub and Sourcerer take longer than most of the
+requests we make, so connections are pooled per origin and reused.
+"""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import http.client
+import io
+import threading
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+
+USER_AGENT = 'sourcerer-hall-of-fame'
+
+# Max number of idle connections kept per origin.
+MAX_IDLE = 8
+
+# Socket timeout, seconds.
+TIMEOUT = 60
+
+MAX_REDIRECTS = 5
+
+
+class Response:
+    """A fully read HTTP response."""
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def getcode(self):
+        return self.status
+
+
+class ConnectionPool:
+    """Idle connections to a single origin."""
+    def __init__(self, scheme, netloc):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        """Returns an idle connection or a new one, and whether it's new."""
+        with self.lock:
+            if self.idle:
+                return self.idle.pop(), False
+
+        if self.scheme == 'https':
+            conn = http.client.HTTPSConnection(self.netloc, timeout=TIMEOUT)
+        else:
+            conn = http.client.HTTPConnection(self.netloc, timeout=TIMEOUT)
+        return conn, True
+
+    def put(self, conn):
+        with self.lock:
+            if len(self.idle) < MAX_IDLE:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+def urlopen(url, headers=None, data=None):
+    """Makes a GET request, or a POST one if there is data, and reads the
+    response.
+
+    Works like urllib's urlopen: follows redirects of GET requests and
+    raises HTTPError for anything but 2xx, including 304.
+
+    Args:
+      url: URL to request.
+      headers: Dict of request headers.
+      data: Bytes to POST.
+    Returns:
+      A Response with its body already read.
+    """
+    method = 'GET' if data is None else 'POST'
+    for _ in range(MAX_REDIRECTS + 1):
+        response = _request(method, url, headers or {}, data)
+        location = response.headers.get('Location')
+        if (method == 'GET' and location and
+                response.status in (301, 302, 303, 307, 308)):
+            url = urljoin(url, location)
+            continue
+
+        if not 200 <= response.status < 300:
+            raise HTTPError(url, response.status, response.reason,
+                            response.headers, io.BytesIO(response.body))
+        return response
+
+    raise URLError('Too many redirects: %s' % url)
+
+
+def close_all():
+    """Closes all idle connections."""
+    with pools_lock:
+        all_pools = list(pools.values())
+    for pool in all_pools:
+        pool.close()
+
+
+def _request(method, url, headers, body):
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https'):
+        raise URLError('Unsupported URL: %s' % url)
+
+    selector = parts.path or '/'
+    if parts.query:
+        selector += '?' + parts.query
+
+    request_headers = {'User-Agent': USER_AGENT}
+    request_headers.update(headers)
+
+    pool = _get_pool(parts.scheme, parts.netloc)
+    while True:
+        conn, is_new = pool.get()
+        try:
+            conn.request(method, selector, body=body, headers=request_headers)
+            r = conn.getresponse()
+            body = r.read()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            if not is_new:
+                continue  # The server must have closed an idle connection.
+            raise URLError(e)
+
+        if r.will_close:
+            conn.close()
+        else:
+            pool.put(conn)
+        return Response(url, r.status, r.reason, r.headers, body)
+
+
+def _get_pool(scheme, netloc):
+    key = (scheme, netloc)
+    with pools_lock:
+        if key not in pools:
+            pools[key] = ConnectionPool(scheme, netloc)
+        return pools[key]
@@ -0,0 +1,32 @@
+"""Bounded concurrency for independent network requests."""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+from concurrent.futures import ThreadPoolExecutor
+
+# Max number of requests in flight at the same time.
+MAX_IN_FLIGHT = 8
+
+max_in_flight = MAX_IN_FLIGHT
+
+
+def configure(max_requests):
+    """Sets max number of requests in flight, 1 makes everything serial."""
+    global max_in_flight
+    max_in_flight = max(1, max_requests)
+
+
+def parallel_map(func, items):
+    """Calls func for every item concurrently.
+
+    Returns results in the order of items. If any call fails, its exception
+    is raised once all calls are finished.
+    """
+    items = list(items)
+    if len(items) < 2 or max_in_flight < 2:
+        return [func(item) for item in items]
+
+    num_workers = min(max_in_flight, len(items))
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        return list(executor.map(func, items))
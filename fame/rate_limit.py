@@ -0,0 +1,149 @@
+"""GitHub API client that keeps track of rate limits.
+
+GitHub tells in every response how many requests are left for a token,
+and when the limit resets. This budget is kept in storage per token, so
+that a refresh can tell beforehand if it fits into what is left, and be
+deferred instead of failing halfway and wasting the requests made.
+"""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import hashlib
+import json
+import time
+from datetime import datetime
+from os import path
+from urllib.error import HTTPError
+
+from . import http_client
+from . import storage
+
+# Resources with separate limits.
+CORE = 'core'
+GRAPHQL = 'graphql'
+
+
+class RateLimitError(Exception):
+    def __init__(self, message, reset):
+        super().__init__(message)
+        self.reset = reset
+
+
+class RateLimitedClient:
+    # Max seconds to wait for Retry-After, longer waits are deferred.
+    MAX_WAIT = 60
+
+    def __init__(self, token):
+        """Creates a client for a token, None for anonymous access."""
+        key = token or 'anonymous'
+        self.key = hashlib.sha1(key.encode()).hexdigest()
+        self.budgets = {}  # Resource -> {'remaining': n, 'reset': epoch}.
+        self.changed = False
+
+    def load(self):
+        try:
+            budget_path = self._get_budget_path()
+            if storage.file_exists(budget_path):
+                self.budgets = json.loads(storage.load_file(budget_path))
+        except Exception as e:
+            print('w Failed to load rate limit budget: %s' % str(e))
+        self.changed = False
+
+    def save(self):
+        if not self.changed:
+            return
+        try:
+            storage.make_dirs(self._get_budget_dir())
+            storage.save_file(self._get_budget_path(),
+                              json.dumps(self.budgets), 'application/json')
+            self.changed = False
+        except Exception as e:
+            print('w Failed to save rate limit budget: %s' % str(e))
+
+    def urlopen(self, url, headers=None, data=None):
+        """Same as http_client.urlopen, but keeps track of the budget.
+
+        A request is retried once if GitHub asks to, and doesn't ask to wait
+        for too long.
+
+        Raises:
+          RateLimitError if out of budget.
+        """
+        for attempt in range(2):
+            try:
+                response = http_client.urlopen(url, headers, data)
+            except HTTPError as e:
+                self.update(e.headers)
+                wait = self._get_wait(e)
+                if wait is None or attempt:
+                    raise
+                print('w Retrying %s in %d seconds' % (url, wait))
+                time.sleep(wait)
+                continue
+
+            self.update(response.headers)
+            return response
+
+    def check(self, cost, resource=CORE):
+        """Raises RateLimitError if there are fewer than cost requests left
+        until the limit resets.
+        """
+        budget = self.budgets.get(resource)
+        if not budget or budget['reset'] <= time.time():
+            return
+        if budget['remaining'] < cost:
+            self._error(resource, budget['reset'])
+
+    def update(self, headers):
+        """Updates the budget from response headers."""
+        if headers is None:
+            return
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+
+        resource = headers.get('X-RateLimit-Resource', CORE)
+        self.budgets[resource] = {'remaining': int(remaining),
+                                  'reset': int(reset)}
+        self.changed = True
+
+    def _get_wait(self, error):
+        """Tells how long to wait before retrying a failed request.
+
+        Args:
+          error: HTTPError of the request.
+        Returns:
+          Seconds to wait, or None if the error is not about rate limits.
+        Raises:
+          RateLimitError if out of budget, or the wait is too long.
+        """
+        if error.code not in (403, 429) or error.headers is None:
+            return None
+
+        retry_after = error.headers.get('Retry-After')
+        if retry_after is not None:
+            wait = int(retry_after)
+            if wait > RateLimitedClient.MAX_WAIT:
+                self._error('secondary', time.time() + wait)
+            return wait
+
+        resource = error.headers.get('X-RateLimit-Resource', CORE)
+        budget = self.budgets.get(resource)
+        if error.headers.get('X-RateLimit-Remaining') == '0' and budget:
+            self._error(resource, budget['reset'])
+        return None
+
+    def _error(self, resource, reset):
+        reset_time = datetime.utcfromtimestamp(reset)
+        raise RateLimitError(
+            'GitHub API %s rate limit exceeded until %s' % (
+                resource, reset_time.strftime('%Y-%m-%d %H:%M:%S')),
+            reset)
+
+    def _get_budget_path(self):
+        return path.join(self._get_budget_dir(), self.key)
+
+    def _get_budget_dir(self):
+        return path.join(storage.SYSTEM_DIR, 'rate_limits')
@@ -19,7 +19,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='repo.proto',
   package='',
   syntax='proto3',
-  serialized_pb=_b('\n\nrepo.proto\":\n\x06\x43ommit\x12\x0b\n\x03sha\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\t\x12\x10\n\x08username\x18\x03 \x01(\t\"2\n\tCommitter\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x13\n\x0bnum_commits\x18\x02 \x01(\x05\"\xcf\x02\n\x04Repo\x12\r\n\x05owner\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04user\x18\x03 \x01(\t\x12$\n\x10top_contributors\x18\x04 \x03(\x0b\x32\n.Committer\x12\x1f\n\x0erecent_commits\x18\x05 \x03(\x0b\x32\x07.Commit\x12\x18\n\x10new_contributors\x18\x06 \x03(\t\x12#\n\x07\x61vatars\x18\x07 \x03(\x0b\x32\x12.Repo.AvatarsEntry\x12\x1c\n\x06status\x18\x08 \x01(\x0e\x32\x0c.Repo.Status\x12\x15\n\rerror_message\x18\t \x01(\t\x1a.\n\x0c\x41vatarsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"1\n\x06Status\x12\x0f\n\x0bUNPROCESSED\x10\x00\x12\x0b\n\x07SUCCESS\x10\x01\x12\t\n\x05\x45RROR\x10\x02\x62\x06proto3')
+  serialized_pb=_b('\n\nrepo.proto\"I\n\x06\x43ommit\x12\x0b\n\x03sha\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\t\x12\x10\n\x08username\x18\x03 \x01(\t\x12\r\n\x05\x65poch\x18\x04 \x01(\x03\"2\n\tCommitter\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x13\n\x0bnum_commits\x18\x02 \x01(\x05\"\xf6\x03\n\x04Repo\x12\r\n\x05owner\x18\x01 \x01(\t\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0c\n\x04user\x18\x03 \x01(\t\x12$\n\x10top_contributors\x18\x04 \x03(\x0b\x32\n.Committer\x12\x1f\n\x0erecent_commits\x18\x05 \x03(\x0b\x32\x07.Commit\x12\x18\n\x10new_contributors\x18\x06 \x03(\t\x12#\n\x07\x61vatars\x18\x07 \x03(\x0b\x32\x12.Repo.AvatarsEntry\x12\x1c\n\x06status\x18\x08 \x01(\x0e\x32\x0c.Repo.Status\x12\x15\n\rerror_message\x18\t \x01(\t\x12.\n\rfirst_commits\x18\n \x03(\x0b\x32\x17.Repo.FirstCommitsEntry\x12\x1e\n\x07\x66\x65tcher\x18\x0b \x01(\x0e\x32\r.Repo.Fetcher\x1a.\n\x0c\x41vatarsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\x1a\x33\n\x11\x46irstCommitsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x03:\x02\x38\x01\"1\n\x06Status\x12\x0f\n\x0bUNPROCESSED\x10\x00\x12\x0b\n\x07SUCCESS\x10\x01\x12\t\n\x05\x45RROR\x10\x02\" \n\x07\x46\x65tcher\x12\x08\n\x04REST\x10\x00\x12\x0b\n\x07GRAPHQL\x10\x01\x62\x06proto3')
 )
 
 
@@ -45,11 +45,33 @@ _REPO_STATUS = _descriptor.EnumDescriptor(
   ],
   containing_type=None,
   options=None,
-  serialized_start=413,
-  serialized_end=462,
+  serialized_start=561,
+  serialized_end=610,
 )
 _sym_db.RegisterEnumDescriptor(_REPO_STATUS)
 
+_REPO_FETCHER = _descriptor.EnumDescriptor(
+  name='Fetcher',
+  full_name='Repo.Fetcher',
+  filename=None,
+  file=DESCRIPTOR,
+  values=[
+    _descriptor.EnumValueDescriptor(
+      name='REST', index=0, number=0,
+      options=None,
+      type=None),
+    _descriptor.EnumValueDescriptor(
+      name='GRAPHQL', index=1, number=1,
+      options=None,
+      type=None),
+  ],
+  containing_type=None,
+  options=None,
+  serialized_start=612,
+  serialized_end=644,
+)
+_sym_db.RegisterEnumDescriptor(_REPO_FETCHER)
+
 
 _COMMIT = _descriptor.Descriptor(
   name='Commit',
@@ -79,6 +101,13 @@ _COMMIT = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='epoch', full_name='Commit.epoch', index=3,
+      number=4, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -92,7 +121,7 @@ _COMMIT = _descriptor.Descriptor(
   oneofs=[
   ],
   serialized_start=14,
-  serialized_end=72,
+  serialized_end=87,
 )
 
 
@@ -129,8 +158,8 @@ _COMMITTER = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=74,
-  serialized_end=124,
+  serialized_start=89,
+  serialized_end=139,
 )
 
 
@@ -167,8 +196,45 @@ _REPO_AVATARSENTRY = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=365,
-  serialized_end=411,
+  serialized_start=460,
+  serialized_end=506,
+)
+
+_REPO_FIRSTCOMMITSENTRY = _descriptor.Descriptor(
+  name='FirstCommitsEntry',
+  full_name='Repo.FirstCommitsEntry',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='key', full_name='Repo.FirstCommitsEntry.key', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='value', full_name='Repo.FirstCommitsEntry.value', index=1,
+      number=2, type=3, cpp_type=2, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=_descriptor._ParseOptions(descriptor_pb2.MessageOptions(), _b('8\001')),
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=508,
+  serialized_end=559,
 )
 
 _REPO = _descriptor.Descriptor(
@@ -241,12 +307,27 @@ _REPO = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='first_commits', full_name='Repo.first_commits', index=9,
+      number=10, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='fetcher', full_name='Repo.fetcher', index=10,
+      number=11, type=14, cpp_type=8, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
-  nested_types=[_REPO_AVATARSENTRY, ],
+  nested_types=[_REPO_AVATARSENTRY, _REPO_FIRSTCOMMITSENTRY, ],
   enum_types=[
     _REPO_STATUS,
+    _REPO_FETCHER,
   ],
   options=None,
   is_extendable=False,
@@ -254,16 +335,20 @@ _REPO = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=127,
-  serialized_end=462,
+  serialized_start=142,
+  serialized_end=644,
 )
 
 _REPO_AVATARSENTRY.containing_type = _REPO
+_REPO_FIRSTCOMMITSENTRY.containing_type = _REPO
 _REPO.fields_by_name['top_contributors'].message_type = _COMMITTER
 _REPO.fields_by_name['recent_commits'].message_type = _COMMIT
 _REPO.fields_by_name['avatars'].message_type = _REPO_AVATARSENTRY
 _REPO.fields_by_name['status'].enum_type = _REPO_STATUS
+_REPO.fields_by_name['first_commits'].message_type = _REPO_FIRSTCOMMITSENTRY
+_REPO.fields_by_name['fetcher'].enum_type = _REPO_FETCHER
 _REPO_STATUS.containing_type = _REPO
+_REPO_FETCHER.containing_type = _REPO
 DESCRIPTOR.message_types_by_name['Commit'] = _COMMIT
 DESCRIPTOR.message_types_by_name['Committer'] = _COMMITTER
 DESCRIPTOR.message_types_by_name['Repo'] = _REPO
@@ -291,14 +376,24 @@ Repo = _reflection.GeneratedProtocolMessageType('Repo', (_message.Message,), dic
     # @@protoc_insertion_point(class_scope:Repo.AvatarsEntry)
     ))
   ,
+
+  FirstCommitsEntry = _reflection.GeneratedProtocolMessageType('FirstCommitsEntry', (_message.Message,), dict(
+    DESCRIPTOR = _REPO_FIRSTCOMMITSENTRY,
+    __module__ = 'repo_pb2'
+    # @@protoc_insertion_point(class_scope:Repo.FirstCommitsEntry)
+    ))
+  ,
   DESCRIPTOR = _REPO,
   __module__ = 'repo_pb2'
   # @@protoc_insertion_point(class_scope:Repo)
   ))
 _sym_db.RegisterMessage(Repo)
 _sym_db.RegisterMessage(Repo.AvatarsEntry)
+_sym_db.RegisterMessage(Repo.FirstCommitsEntry)
 
 
 _REPO_AVATARSENTRY.has_options = True
 _REPO_AVATARSENTRY._options = _descriptor._ParseOptions(descriptor_pb2.MessageOptions(), _b('8\001'))
+_REPO_FIRSTCOMMITSENTRY.has_options = True
+_REPO_FIRSTCOMMITSENTRY._options = _descriptor._ParseOptions(descriptor_pb2.MessageOptions(), _b('8\001'))
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,64 @@
+"""Spreads refreshes of tracked repos over time.
+
+Refreshing all repos at once makes a spike of GitHub requests, and burns
+tokens of users who track many repos all at the same time. Instead, the
+refresh period is split into time slots, and every slot gets its share.
+"""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import calendar
+import zlib
+
+# Every repo is refreshed once per period, seconds.
+REFRESH_PERIOD = 3600
+
+
+def get_slot(now, num_slots):
+    """Returns the time slot for a datetime.
+
+    Slots start every REFRESH_PERIOD / num_slots seconds. The time is
+    rounded to the nearest slot start, so that a trigger firing a bit early
+    or late still gets the slot it was meant for.
+    """
+    seconds = calendar.timegm(now.timetuple()) % REFRESH_PERIOD
+    return round(seconds * num_slots / REFRESH_PERIOD) % num_slots
+
+
+def assign_slots(repos, num_slots):
+    """Spreads repos over time slots.
+
+    Repos of the same user share a GitHub token, so they go to consecutive
+    slots from one picked by the user's hash, in the order of their own
+    hashes. A user with up to num_slots repos never has two of them in one
+    slot. Adding or removing a repo moves the user's repos ranked after it
+    by one slot, repos of other users never move.
+
+    Args:
+      repos: Iterable of (user, owner, repo) tuples.
+      num_slots: Number of time slots.
+    Returns:
+      A list of num_slots lists of (user, owner, repo) tuples.
+    """
+    by_user = {}
+    for user, owner, repo in repos:
+        by_user.setdefault(user, []).append((owner, repo))
+
+    slots = [[] for _ in range(num_slots)]
+    for user, user_repos in by_user.items():
+        start = zlib.crc32(user.encode())
+        user_repos.sort(key=lambda r: (_hash_repo(*r), r))
+        for rank, (owner, repo) in enumerate(user_repos):
+            slots[(start + rank) % num_slots].append((user, owner, repo))
+
+    return slots
+
+
+def _hash_repo(owner, repo):
+    return zlib.crc32(('%s/%s' % (owner, repo)).encode())
+
+
+def get_due_repos(repos, now, num_slots):
+    """Returns repos to refresh in the time slot of now."""
+    return assign_slots(repos, num_slots)[get_slot(now, num_slots)]
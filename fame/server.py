@@ -0,0 +1,184 @@
+"""HTTP frontend for halls of fame in storage.
+
+Serves URLs of the same shape as the ones in integration code:
+
+  /<user>/<owner>/<repo>/images/<n>  SVG of a slot.
+  /<user>/<owner>/<repo>/links/<n>   Redirect to the profile of a slot.
+  /<user>/<owner>/<repo>/bundle      SVG of all entries, if made.
+
+Parsed links and image data are kept in memory per manifest version, so
+a request costs a manifest check at most once in MANIFEST_TTL seconds.
+"""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import gzip
+import hashlib
+import json
+import re
+import socketserver
+from os import path
+from wsgiref import simple_server
+
+from . import storage
+from .cache import LRUCache
+from .glory import Glory
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+class FameServer:
+    """WSGI application serving images and links."""
+    MAX_MEMORY = 64 * 1024 * 1024  # Max total size of cached data.
+    MAX_MANIFESTS = 10000          # Max number of repos to keep manifests of.
+    MANIFEST_TTL = 10              # Seconds to trust a loaded manifest.
+
+    # Names can't start with a dot, so that nothing outside of repo dirs,
+    # e.g. '..' or the system dir, is ever served.
+    PATH_RE = re.compile(
+        r'^/([^/.][^/]*)/([^/.][^/]*)/([^/.][^/]*)/'
+        r'(images/\d+|links/\d+|bundle)(?:\.svg)?$')
+
+    def __init__(self, max_memory=MAX_MEMORY, manifest_ttl=MANIFEST_TTL):
+        self.cache = LRUCache(max_memory)
+        self.manifests = LRUCache(FameServer.MAX_MANIFESTS, manifest_ttl)
+
+    def __call__(self, environ, start_response):
+        match = FameServer.PATH_RE.match(environ.get('PATH_INFO', ''))
+        if not match:
+            return self._respond(start_response, '404 Not Found')
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self._respond(start_response, '405 Method Not Allowed',
+                                 [('Allow', 'GET, HEAD')])
+
+        user, owner, name, what = match.groups()
+        repo_dir = path.join(user, owner, name)
+        kind, _, num = what.partition('/')
+        try:
+            manifest = self._get_manifest(repo_dir)
+            output = manifest.get('output', Glory.SLOTS_OUTPUT)
+            if kind == 'bundle':
+                if not manifest or output == Glory.SLOTS_OUTPUT:
+                    return self._respond(start_response, '404 Not Found')
+                return self._serve_image(
+                    environ, start_response, repo_dir, manifest, kind,
+                    'bundle.svg', manifest.get('bundle_hash'))
+
+            num = int(num)
+            if (not manifest or output == Glory.BUNDLE_OUTPUT or
+                    num > Glory.MAX_ALL):
+                return self._respond(start_response, '404 Not Found')
+            if kind == 'links':
+                return self._serve_link(start_response, repo_dir,
+                                        manifest, num)
+            hashes = manifest.get('hashes', [])
+            return self._serve_image(
+                environ, start_response, repo_dir, manifest, num,
+                path.join('images', '%d.svg' % num),
+                hashes[num] if num < len(hashes) else None)
+        except Exception as e:
+            print('e Failed to serve %s: %s' % (environ['PATH_INFO'], str(e)))
+            return self._respond(start_response, '500 Internal Server Error')
+
+    def _serve_link(self, start_response, repo_dir, manifest, num):
+        links = self._get_cached(repo_dir, manifest, 'links',
+                                 lambda: self._load_links(repo_dir))
+        if num >= len(links):
+            return self._respond(start_response, '404 Not Found')
+        return self._respond(start_response, '302 Found',
+                             [('Location', links[num]),
+                              ('Cache-Control', Glory.CACHE_CONTROL)])
+
+    def _serve_image(self, environ, start_response, repo_dir, manifest,
+                     what, image_path, data_hash):
+        """Serves an SVG, its hash from the manifest is the ETag.
+
+        Gzipped and plain bodies are different representations, so they
+        have different ETags.
+        """
+        image_path = path.join(repo_dir, image_path)
+        data = self._get_cached(repo_dir, manifest, what,
+                                lambda: storage.load_bytes(image_path))
+        etag = data_hash or hashlib.sha1(data).hexdigest()
+
+        headers = [('Content-Type', 'image/svg+xml'),
+                   ('Cache-Control', Glory.CACHE_CONTROL),
+                   ('Vary', 'Accept-Encoding')]
+        decompress = False
+        if data.startswith(GZIP_MAGIC):
+            if 'gzip' in environ.get('HTTP_ACCEPT_ENCODING', ''):
+                headers.append(('Content-Encoding', 'gzip'))
+                etag += '-gz'
+            else:
+                decompress = True
+
+        etag = '"%s"' % etag
+        headers.append(('ETag', etag))
+        if etag in self._get_etags(environ):
+            return self._respond(start_response, '304 Not Modified', headers)
+
+        if decompress:
+            data = gzip.decompress(data)
+        headers.append(('Content-Length', str(len(data))))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        return [data]
+
+    def _get_manifest(self, repo_dir):
+        manifest = self.manifests.get(repo_dir)
+        if manifest is None:
+            manifest_path = path.join(repo_dir, 'manifest.json')
+            manifest = {}
+            if storage.file_exists(manifest_path):
+                manifest = json.loads(storage.load_file(manifest_path))
+            self.manifests.put(repo_dir, manifest)
+        return manifest
+
+    def _get_cached(self, repo_dir, manifest, what, load):
+        """Returns data of an installed manifest version, loading if needed.
+
+        Data of other versions of the repo is dropped once a new version
+        is loaded.
+        """
+        version = manifest.get('version', 0)
+        key = (repo_dir, version, what)
+        data = self.cache.get(key)
+        if data is None:
+            self.cache.remove_matching(
+                lambda k: k[0] == repo_dir and k[1] != version)
+            data = load()
+            size = (len(data) if isinstance(data, bytes)
+                    else sum(len(link) for link in data))
+            self.cache.put(key, data, size=size)
+        return data
+
+    @staticmethod
+    def _load_links(repo_dir):
+        links = storage.load_file(path.join(repo_dir, 'links.txt'))
+        return links.splitlines()
+
+    @staticmethod
+    def _get_etags(environ):
+        header = environ.get('HTTP_IF_NONE_MATCH', '')
+        return [tag.strip().replace('W/', '', 1) for tag in header.split(',')]
+
+    @staticmethod
+    def _respond(start_response, status, headers=None):
+        start_response(status, (headers or []) + [('Content-Length', '0')])
+        return []
+
+
+class ThreadingWSGIServer(socketserver.ThreadingMixIn,
+                          simple_server.WSGIServer):
+    daemon_threads = True
+
+
+def serve(host='', port=8080, app=None):
+    """Serves halls of fame from configured storage until interrupted."""
+    app = app or FameServer()
+    httpd = simple_server.make_server(host, port, app,
+                                      server_class=ThreadingWSGIServer)
+    print('i Serving at port %d' % port)
+    httpd.serve_forever()
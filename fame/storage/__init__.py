@@ -3,12 +3,19 @@
 __author__ = 'Sergey Surkov'
 __copyright__ = '2018 Sourcerer, Inc'
 
+from .caching_storage import CachingStorage
+from .storage import SYSTEM_DIR
 from .storage import configure_for_local, configure_for_google_cloud
-from .storage import (make_dirs, list_dir, file_exists, dir_exists,
-                      last_modified, move_file, remove_file, remove_subtree,
-                      save_file, load_file)
+from .storage import (make_dirs, list_dir, list_modified, file_exists,
+                      dir_exists, last_modified, move_file, remove_file,
+                      remove_subtree, save_file, load_file, save_bytes,
+                      load_bytes, move_files, save_files, delete_files,
+                      open_read)
 
-__all__ = ['configure_for_local', 'configure_for_google_cloud',
-           'make_dirs', 'list_dir', 'file_exists', 'dir_exists',
-           'last_modified', 'move_file', 'remove_file', 'remove_subtree',
-           'save_file', 'load_file']
+__all__ = ['CachingStorage', 'SYSTEM_DIR',
+           'configure_for_local', 'configure_for_google_cloud',
+           'make_dirs', 'list_dir', 'list_modified', 'file_exists',
+           'dir_exists', 'last_modified', 'move_file', 'remove_file',
+           'remove_subtree', 'save_file', 'load_file', 'save_bytes',
+           'load_bytes', 'move_files', 'save_files', 'delete_files',
+           'open_read']
@@ -0,0 +1,191 @@
+"""Storage that caches another storage in memory."""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import io
+
+from ..cache import LRUCache
+from .storage_base import StorageBase
+
+
+class CachingStorage(StorageBase):
+    """Read-through cache of file contents and metadata.
+
+    Everything written through the cache is cached as well. Entries expire
+    after a TTL, as other processes write to the same storage.
+    """
+    MAX_SIZE = 32 * 1024 * 1024  # Max total size of cached data.
+    TTL = 60                     # Seconds to keep an entry.
+
+    # Size of a metadata entry, for accounting.
+    METADATA_SIZE = 256
+
+    def __init__(self, backend, max_size=MAX_SIZE, ttl=TTL):
+        """Creates a cache.
+
+        Args:
+          backend: StorageBase to cache.
+          max_size: Max total size of cached data.
+          ttl: Seconds to keep an entry.
+        """
+        self.backend = backend
+        self.cache = LRUCache(max_size, ttl)
+
+    def make_dirs(self, path):
+        self.backend.make_dirs(path)
+        self._invalidate_dirs(path)
+
+    def move_file(self, from_path, to_path):
+        moved = self.backend.move_file(from_path, to_path)
+        self._move_cached(from_path, to_path)
+        return moved
+
+    def remove_file(self, path):
+        removed = self.backend.remove_file(path)
+        self._invalidate(path)
+        return removed
+
+    def remove_subtree(self, path):
+        self.backend.remove_subtree(path)
+        prefix = self._normalize(path)
+        self.cache.remove_matching(
+            lambda key: key[1] == prefix or key[1].startswith(prefix + '/'))
+        self._invalidate_dirs(prefix)
+
+    def list_dir(self, dir_path, include_files=True, include_subdirs=True):
+        key = ('list', self._normalize(dir_path),
+               include_files, include_subdirs)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.backend.list_dir(dir_path, include_files,
+                                           include_subdirs)
+            self._put_metadata(key, result)
+        return list(result)
+
+    def list_modified(self, dir_path):
+        # Only used for cleanups, which want fresh times.
+        return self.backend.list_modified(dir_path)
+
+    def file_exists(self, file_path):
+        path = self._normalize(file_path)
+        if (self.cache.get(('bytes', path)) is not None or
+                self.cache.get(('text', path)) is not None):
+            return True
+
+        key = ('exists', path)
+        exists = self.cache.get(key)
+        if exists is None:
+            exists = self.backend.file_exists(file_path)
+            self._put_metadata(key, exists)
+        return exists
+
+    def dir_exists(self, dir_path):
+        key = ('dir', self._normalize(dir_path))
+        exists = self.cache.get(key)
+        if exists is None:
+            exists = self.backend.dir_exists(dir_path)
+            self._put_metadata(key, exists)
+        return exists
+
+    def last_modified(self, path):
+        key = ('modified', self._normalize(path))
+        modified = self.cache.get(key)
+        if modified is None:
+            modified = self.backend.last_modified(path)
+            self._put_metadata(key, modified)
+        return modified
+
+    def save_file(self, path, data, content_type='text/plain'):
+        self.backend.save_file(path, data, content_type)
+        self._written(path, 'text', data)
+
+    def load_file(self, path):
+        key = ('text', self._normalize(path))
+        data = self.cache.get(key)
+        if data is None:
+            data = self.backend.load_file(path)
+            self.cache.put(key, data, size=len(data))
+        return data
+
+    def save_bytes(self, path, data,
+                   content_type='application/octet-stream',
+                   content_encoding=None, cache_control=None):
+        self.backend.save_bytes(path, data, content_type, content_encoding,
+                                cache_control)
+        self._written(path, 'bytes', bytes(data))
+
+    def load_bytes(self, path):
+        key = ('bytes', self._normalize(path))
+        data = self.cache.get(key)
+        if data is None:
+            data = self.backend.load_bytes(path)
+            self.cache.put(key, data, size=len(data))
+        return data
+
+    def open_read(self, path):
+        data = self.cache.get(('bytes', self._normalize(path)))
+        if data is not None:
+            return io.BytesIO(data)
+        return self.backend.open_read(path)
+
+    def move_files(self, moves):
+        moves = list(moves)
+        self.backend.move_files(moves)
+        for from_path, to_path in moves:
+            self._move_cached(from_path, to_path)
+
+    def save_files(self, files):
+        files = list(files)
+        self.backend.save_files(files)
+        for path, data, *_ in files:
+            if isinstance(data, str):
+                self._written(path, 'text', data)
+            else:
+                self._written(path, 'bytes', bytes(data))
+
+    def delete_files(self, paths):
+        paths = list(paths)
+        self.backend.delete_files(paths)
+        for path in paths:
+            self._invalidate(path)
+
+    def _written(self, path, kind, data):
+        self._invalidate(path)
+        path = self._normalize(path)
+        self.cache.put((kind, path), data, size=len(data))
+        self._put_metadata(('exists', path), True)
+
+    def _move_cached(self, from_path, to_path):
+        from_path = self._normalize(from_path)
+        cached = [(kind, self.cache.get((kind, from_path)))
+                  for kind in ('text', 'bytes')]
+        self._invalidate(from_path)
+        self._invalidate(to_path)
+        for kind, data in cached:
+            if data is not None:
+                self._written(to_path, kind, data)
+
+    def _invalidate(self, path):
+        path = self._normalize(path)
+        for kind in ('text', 'bytes', 'exists', 'modified'):
+            self.cache.remove((kind, path))
+        self._invalidate_dirs(path)
+
+    def _invalidate_dirs(self, path):
+        """Invalidates listings of all directories on a path."""
+        parts = path.strip('/').split('/')
+        for i in range(len(parts) + 1):
+            dir_path = '/'.join(parts[:i])
+            self.cache.remove(('dir', dir_path))
+            for include_files in (True, False):
+                for include_subdirs in (True, False):
+                    self.cache.remove(('list', dir_path,
+                                       include_files, include_subdirs))
+
+    def _put_metadata(self, key, value):
+        self.cache.put(key, value, size=CachingStorage.METADATA_SIZE)
+
+    @staticmethod
+    def _normalize(path):
+        return path.strip('/')
@@ -3,14 +3,20 @@
 __author__ = 'Sergey Surkov'
 __copyright__ = '2018 Sourcerer, Inc'
 
+import io
+
 import pytz
 from google.api_core.exceptions import NotFound
 from google.cloud import storage as gstorage
 
+from .. import parallel
 from .storage_base import StorageBase
 
 
 class GoogleCloudStorage(StorageBase):
+    # Max number of calls in a batch request.
+    MAX_BATCH = 100
+
     def __init__(self, bucket):
         self.client = gstorage.Client()
         self.bucket = self.client.get_bucket(bucket)
@@ -38,7 +44,37 @@ class GoogleCloudStorage(StorageBase):
         if not path.endswith('/'):
             path += '/'
         blobs = list(self.bucket.list_blobs(prefix=path))
-        self.bucket.delete_blobs(blobs)
+        self.delete_files([blob.name for blob in blobs])
+
+    def move_files(self, moves):
+        # Copies are made server-side, and only then are sources deleted.
+        moves = list(moves)
+        for chunk in self._chunks(moves):
+            with self.client.batch():
+                for from_path, to_path in chunk:
+                    blob = self.bucket.blob(from_path)
+                    self.bucket.copy_blob(blob, self.bucket, to_path)
+        self.delete_files([from_path for from_path, _ in moves])
+
+    def save_files(self, files):
+        # Uploads can't go into a batch request, so they go in parallel.
+        def save(file):
+            path, data, content_type, *encoding = file
+            if isinstance(data, str):
+                self.save_file(path, data, content_type)
+            else:
+                self.save_bytes(path, data, content_type, *encoding)
+
+        parallel.parallel_map(save, files)
+
+    def delete_files(self, paths):
+        for chunk in self._chunks(list(paths)):
+            try:
+                with self.client.batch():
+                    for path in chunk:
+                        self.bucket.delete_blob(path)
+            except NotFound:
+                pass  # The rest of the batch is still done.
 
     def list_dir(self, dir_path, include_files=True, include_subdirs=True):
         if dir_path and not dir_path.endswith('/'):
@@ -56,6 +92,15 @@ class GoogleCloudStorage(StorageBase):
         discard = len(dir_path)
         return [e[discard:].strip('/') for e in result]
 
+    def list_modified(self, dir_path):
+        if dir_path and not dir_path.endswith('/'):
+            dir_path += '/'
+        blobs = self.bucket.list_blobs(prefix=dir_path, delimiter='/')
+        discard = len(dir_path)
+        return [(b.name[discard:],
+                 b.updated.astimezone(pytz.utc).replace(tzinfo=None))
+                for b in blobs]
+
     def file_exists(self, file_path):
         return self.bucket.get_blob(file_path) is not None
 
@@ -72,9 +117,34 @@ class GoogleCloudStorage(StorageBase):
         return blob.updated.astimezone(pytz.utc).replace(tzinfo=None)
 
     def save_file(self, path, data, content_type='text/plain'):
-        blob = self.bucket.blob(path)
-        blob.upload_from_string(data, content_type=content_type)
+        self.save_bytes(path, data.encode(), content_type)
 
     def load_file(self, path):
+        return self.load_bytes(path).decode()
+
+    def save_bytes(self, path, data,
+                   content_type='application/octet-stream',
+                   content_encoding=None, cache_control=None):
+        blob = self.bucket.blob(path)
+        # With gzip encoding, GCS serves data compressed to clients that
+        # accept it, and decompresses it for the rest.
+        blob.content_encoding = content_encoding
+        blob.cache_control = cache_control
+        blob.upload_from_file(io.BytesIO(data), size=len(data),
+                              content_type=content_type)
+
+    def load_bytes(self, path):
         blob = self.bucket.blob(path)
-        return blob.download_as_string().decode()
+        return blob.download_as_string()
+
+    def open_read(self, path):
+        # Blobs are downloaded whole, the client can't stream them.
+        f = io.BytesIO()
+        self.bucket.blob(path).download_to_file(f)
+        f.seek(0)
+        return f
+
+    @staticmethod
+    def _chunks(items):
+        for i in range(0, len(items), GoogleCloudStorage.MAX_BATCH):
+            yield items[i:i + GoogleCloudStorage.MAX_BATCH]
@@ -3,14 +3,19 @@
 __author__ = 'Sergey Surkov'
 __copyright__ = '2018 Sourcerer, Inc'
 
+import mmap
 import os
 import shutil
+import threading
 from datetime import datetime
 
 from .storage_base import StorageBase
 
 
 class LocalStorage(StorageBase):
+    # Files at least this large are memory mapped for reading.
+    MMAP_MIN_SIZE = 64 * 1024
+
     def __init__(self, work_dir):
         self.work_dir = work_dir
 
@@ -33,6 +38,24 @@ class LocalStorage(StorageBase):
         except OSError:
             return False
 
+    def move_files(self, moves):
+        for from_path, to_path in moves:
+            os.replace(os.path.join(self.work_dir, from_path),
+                       os.path.join(self.work_dir, to_path))
+
+    def save_files(self, files):
+        for path, data, content_type, *encoding in files:
+            if isinstance(data, str):
+                data = data.encode()
+            self.save_bytes(path, data, content_type, *encoding)
+
+    def delete_files(self, paths):
+        for path in paths:
+            try:
+                os.remove(os.path.join(self.work_dir, path))
+            except FileNotFoundError:
+                pass
+
     def remove_subtree(self, path):
         full_path = os.path.join(self.work_dir, path)
         shutil.rmtree(full_path, ignore_errors=True)
@@ -51,6 +74,19 @@ class LocalStorage(StorageBase):
 
         return result
 
+    def list_modified(self, dir_path):
+        full_path = os.path.join(self.work_dir, dir_path)
+        result = []
+        for entry in os.scandir(full_path):
+            try:
+                if entry.is_file():
+                    modified = entry.stat().st_mtime
+                    result.append((entry.name,
+                                   datetime.utcfromtimestamp(modified)))
+            except FileNotFoundError:
+                pass  # Removed or renamed while listing.
+        return result
+
     def file_exists(self, file_path):
         full_path = os.path.join(self.work_dir, file_path)
         return os.path.isfile(full_path)
@@ -64,11 +100,44 @@ class LocalStorage(StorageBase):
         return datetime.utcfromtimestamp(os.path.getmtime(full_path))
 
     def save_file(self, path, data, content_type='text/plain'):
-        full_path = os.path.join(self.work_dir, path)
-        with open(full_path, 'w') as f:
-            f.write(data)
+        self.save_bytes(path, data.encode(), content_type)
 
     def load_file(self, path):
+        return self.load_bytes(path).decode()
+
+    def save_bytes(self, path, data,
+                   content_type='application/octet-stream',
+                   content_encoding=None, cache_control=None):
+        # Serving headers are not kept, files are served as is.
+        # Write to a temp file and rename, so readers never see half a file.
+        full_path = os.path.join(self.work_dir, path)
+        temp_path = '%s.%d.%d.tmp' % (full_path, os.getpid(),
+                                      threading.get_ident())
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def load_bytes(self, path):
         full_path = os.path.join(self.work_dir, path)
-        with open(full_path, 'r') as f:
+        with open(full_path, 'rb') as f:
             return f.read()
+
+    def open_read(self, path):
+        """Opens a file, memory mapped if it's large.
+
+        A memory mapped file reads like a file, and can also be sliced or
+        wrapped in a memoryview without copying.
+        """
+        full_path = os.path.join(self.work_dir, path)
+        f = open(full_path, 'rb')
+        if os.fstat(f.fileno()).st_size < LocalStorage.MMAP_MIN_SIZE:
+            return f
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()  # The mapping stays.
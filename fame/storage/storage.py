@@ -3,20 +3,47 @@
 __author__ = 'Sergey Surkov'
 __copyright__ = '2018 Sourcerer, Inc'
 
+from .caching_storage import CachingStorage
 from .local_storage import LocalStorage
 from .google_cloud_storage import GoogleCloudStorage
 
+# Top level directory for data that doesn't belong to a user, e.g. caches.
+# GitHub usernames never start with a dot.
+SYSTEM_DIR = '.fame'
+
 storage = None
 
 
-def configure_for_local(work_dir):
+def configure_for_local(work_dir, cache_size=0,
+                        cache_ttl=CachingStorage.TTL):
+    """Configures storage in a local directory.
+
+    Args:
+      work_dir: Directory to store data in.
+      cache_size: Max size of in-memory cache, 0 for no cache.
+      cache_ttl: Seconds to keep cached entries.
+    """
     global storage
-    storage = LocalStorage(work_dir)
+    storage = _with_cache(LocalStorage(work_dir), cache_size, cache_ttl)
+
 
+def configure_for_google_cloud(bucket, cache_size=0,
+                               cache_ttl=CachingStorage.TTL):
+    """Configures storage in a Google cloud bucket.
 
-def configure_for_google_cloud(bucket):
+    Args:
+      bucket: Bucket to store data in.
+      cache_size: Max size of in-memory cache, 0 for no cache.
+      cache_ttl: Seconds to keep cached entries.
+    """
     global storage
-    storage = GoogleCloudStorage(bucket)
+    storage = _with_cache(GoogleCloudStorage(bucket), cache_size, cache_ttl)
+
+
+def _with_cache(backend, cache_size, cache_ttl):
+    if not cache_size:
+        return backend
+    return CachingStorage(backend, cache_size, cache_ttl)
 
 
 def make_dirs(path):
@@ -33,6 +60,13 @@ def move_file(from_path, to_path):
     return storage.move_file(from_path, to_path)
 
 
+def move_files(moves):
+    """Moves files, given as (from_path, to_path) pairs, in a batch."""
+    if not storage:
+        error('Storage not initialized')
+    return storage.move_files(moves)
+
+
 def remove_file(path):
     """Removes a file."""
     if not storage:
@@ -40,6 +74,13 @@ def remove_file(path):
     return storage.remove_file(path)
 
 
+def delete_files(paths):
+    """Removes files in a batch, missing ones are ignored."""
+    if not storage:
+        error('Storage not initialized')
+    return storage.delete_files(paths)
+
+
 def remove_subtree(path):
     """Deletes directory and all its contents."""
     if not storage:
@@ -53,6 +94,13 @@ def list_dir(dir_path, include_files=True, include_subdirs=True):
     return storage.list_dir(dir_path, include_files, include_subdirs)
 
 
+def list_modified(dir_path):
+    """Lists files in a directory as (name, last modified) pairs."""
+    if not storage:
+        error('Storage not initialized')
+    return storage.list_modified(dir_path)
+
+
 def file_exists(file_path):
     if not storage:
         error('Storage not initialized')
@@ -77,12 +125,43 @@ def save_file(path, data, content_type='text/plain'):
     return storage.save_file(path, data, content_type)
 
 
+def save_files(files):
+    """Saves files, given as (path, data, content_type) tuples, in a batch."""
+    if not storage:
+        error('Storage not initialized')
+    return storage.save_files(files)
+
+
 def load_file(path):
     if not storage:
         error('Storage not initialized')
     return storage.load_file(path)
 
 
+def save_bytes(path, data, content_type='application/octet-stream',
+               content_encoding=None, cache_control=None):
+    """Saves bytes as they are, encoding and cache control are only for
+    serving.
+    """
+    if not storage:
+        error('Storage not initialized')
+    return storage.save_bytes(path, data, content_type, content_encoding,
+                              cache_control)
+
+
+def load_bytes(path):
+    if not storage:
+        error('Storage not initialized')
+    return storage.load_bytes(path)
+
+
+def open_read(path):
+    """Opens a file for reading bytes, returns a file-like object."""
+    if not storage:
+        error('Storage not initialized')
+    return storage.open_read(path)
+
+
 class StorageError(Exception):
     def __init__(self, message):
         super().__init__(message)
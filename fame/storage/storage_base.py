@@ -20,6 +20,14 @@ class StorageBase:
     def list_dir(self, dir_path, include_files=True, include_subdirs=True):
         pass
 
+    def list_modified(self, dir_path):
+        """Lists files in a directory with their last modified UTC times.
+
+        Returns:
+          List of (name, datetime) pairs, in one listing request.
+        """
+        pass
+
     def file_exists(self, file_path):
         pass
 
@@ -31,3 +39,47 @@ class StorageBase:
 
     def load_file(self, path):
         pass
+
+    def save_bytes(self, path, data,
+                   content_type='application/octet-stream',
+                   content_encoding=None, cache_control=None):
+        """Saves bytes as they are.
+
+        Args:
+          path: Path to save to.
+          data: Bytes, or anything supporting the buffer protocol.
+          content_type: MIME type of the data.
+          content_encoding: Encoding of the data if any, e.g. 'gzip', for
+            serving. Data is stored and loaded encoded.
+          cache_control: Cache-Control header for serving.
+        """
+        pass
+
+    def load_bytes(self, path):
+        pass
+
+    def open_read(self, path):
+        """Opens a file for reading bytes, returns a file-like object."""
+        pass
+
+    def move_files(self, moves):
+        """Moves files, given as (from_path, to_path) pairs."""
+        for from_path, to_path in moves:
+            self.move_file(from_path, to_path)
+
+    def save_files(self, files):
+        """Saves files, given as (path, data, content_type) tuples.
+
+        Data is either a string, or bytes. Bytes may be followed by their
+        content encoding and cache control in a tuple.
+        """
+        for path, data, content_type, *encoding in files:
+            if isinstance(data, str):
+                self.save_file(path, data, content_type)
+            else:
+                self.save_bytes(path, data, content_type, *encoding)
+
+    def delete_files(self, paths):
+        """Removes files, missing ones are ignored."""
+        for path in paths:
+            self.remove_file(path)
@@ -0,0 +1,117 @@
+"""String level SVG rendering.
+
+Templates are built with ElementTree once, with slot markers in place of
+the values, and serialized. Rendering is then a matter of joining the
+serialized pieces with values, and gives exactly what ElementTree would.
+"""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import re
+from xml.etree import ElementTree
+
+
+def slot(name):
+    """Returns a marker for a named slot, to be put into a template."""
+    return '@@%s@@' % name
+
+
+class SvgTemplate:
+    """SVG split into literal pieces and named slots."""
+    SLOT_RE = re.compile(r'@@(\w+)@@')
+
+    def __init__(self, svg):
+        # Pieces at even indices are literal, at odd ones are slot names.
+        self.pieces = SvgTemplate.SLOT_RE.split(svg)
+        self.slots = set(self.pieces[1::2])
+
+    @staticmethod
+    def from_element(element):
+        return SvgTemplate(ElementTree.tostring(element, encoding='unicode'))
+
+    def render(self, **values):
+        """Fills slots with values, which must be escaped already."""
+        pieces = list(self.pieces)
+        pieces[1::2] = [values[name] for name in self.pieces[1::2]]
+        return ''.join(pieces)
+
+
+def escape_attribute(value):
+    """Escapes an attribute value the same way ElementTree does."""
+    value = value.replace('&', '&amp;')
+    value = value.replace('<', '&lt;')
+    value = value.replace('>', '&gt;')
+    value = value.replace('"', '&quot;')
+    value = value.replace('\r', '&#13;')
+    value = value.replace('\n', '&#10;')
+    value = value.replace('\t', '&#09;')
+    return value
+
+
+def get_child_svg(parent):
+    """Serializes the only child of an element as it is within its parent.
+
+    Namespaces are declared on the element being serialized, so a nested
+    element looks different on its own.
+    """
+    svg = ElementTree.tostring(parent, encoding='unicode')
+    start = svg.index('>') + 1
+    end = svg.rindex('<')
+    return svg[start:end]
+
+
+ROOT_RE = re.compile(r'<svg\b([^>]*)>')
+VIEW_BOX_RE = re.compile(r'\bviewBox="([^"]*)"')
+# Root attributes replaced when nesting an SVG.
+PLACEMENT_RE = re.compile(r'\s+(?:x|y|width|height)="[^"]*"')
+ID_RE = re.compile(r'\bid="([^"]*)"')
+
+
+def make_bundle(svgs, links, height, gap=0):
+    """Puts SVGs in a row into one SVG, each linking to a URL.
+
+    Links work when the bundle is embedded as an object or inline, not as
+    an image.
+
+    Args:
+      svgs: SVG strings, each with a viewBox, scaled to the height.
+      links: URLs, one per SVG.
+      height: Height of the bundle in pixels.
+      gap: Pixels between SVGs.
+    Returns:
+      The bundle as an SVG string.
+    """
+    x = 0
+    entries = []
+    for i, (svg, link) in enumerate(zip(svgs, links)):
+        svg = _prefix_ids(svg, 'e%d-' % i)
+        root = ROOT_RE.search(svg)
+        view_box = VIEW_BOX_RE.search(root.group(1)).group(1)
+        _, _, view_w, view_h = [float(v) for v in view_box.split()]
+        width = height * view_w / view_h
+
+        attributes = PLACEMENT_RE.sub('', root.group(1))
+        nested = '<svg%s x="%.02f" width="%.02f" height="%.02f">%s' % (
+            attributes, x, width, height, svg[root.end():])
+        entries.append('<a xlink:href="%s" target="_top">%s</a>' % (
+            escape_attribute(link), nested))
+        x += width + gap
+
+    width = max(0, x - gap)
+    return ('<svg xmlns="http://www.w3.org/2000/svg" '
+            'xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" '
+            'width="%.02f" height="%.02f" viewBox="0 0 %.02f %.02f">'
+            '%s</svg>' % (width, height, width, height, ''.join(entries)))
+
+
+def _prefix_ids(svg, prefix):
+    """Prefixes ids and references to them, so that SVGs put together
+    don't refer to each other's elements.
+    """
+    for element_id in set(ID_RE.findall(svg)):
+        new_id = prefix + element_id
+        svg = svg.replace('id="%s"' % element_id, 'id="%s"' % new_id)
+        svg = svg.replace('url(#%s)' % element_id, 'url(#%s)' % new_id)
+        svg = svg.replace('href="#%s"' % element_id, 'href="#%s"' % new_id)
+    return svg
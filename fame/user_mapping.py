@@ -0,0 +1,89 @@
+"""Cache of GitHub to Sourcerer user mapping.
+
+The same contributors show up in many tracked repos, so their Sourcerer
+usernames are kept in memory and in storage, and only the ones not cached
+are asked for. Users without a Sourcerer account are cached too, for less
+time, as they may sign up any moment.
+"""
+
+__author__ = 'Sergey Surkov'
+__copyright__ = '2018 Sourcerer, Inc'
+
+import time
+
+from . import parallel
+from .avatar_cache import StorageTier
+from .cache import LRUCache
+
+
+class UserMappingCache:
+    TTL = 24 * 3600          # Seconds to keep a Sourcerer username.
+    NEGATIVE_TTL = 3 * 3600  # Seconds to remember there is none.
+    MAX_ENTRIES = 100000     # Max number of users in memory.
+
+    def __init__(self, ttl=TTL, negative_ttl=NEGATIVE_TTL,
+                 max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # Users without a Sourcerer account are kept as empty strings.
+        self.memory = LRUCache(max_entries)
+        # Entries of users with an account are kept the longest.
+        self.stored = StorageTier('user mapping', 'user_mapping', ttl,
+                                  max_entries, 'github_username')
+
+    def lookup(self, github_usernames):
+        """Looks up cached Sourcerer usernames.
+
+        Args:
+          github_usernames: GitHub usernames to look up.
+        Returns:
+          A dict of GitHub usernames to Sourcerer usernames, or None for
+          users without a Sourcerer account, and a list of GitHub usernames
+          not in the cache.
+        """
+        mapping = {}
+        not_in_memory = []
+        for github_username in github_usernames:
+            sourcerer_username = self.memory.get(github_username)
+            if sourcerer_username is None:
+                not_in_memory.append(github_username)
+            else:
+                mapping[github_username] = sourcerer_username or None
+
+        misses = []
+        entries = parallel.parallel_map(self.stored.load, not_in_memory)
+        for github_username, entry in zip(not_in_memory, entries):
+            if not entry or entry['expires'] < time.time():
+                misses.append(github_username)
+                continue
+
+            sourcerer_username = entry['sourcerer_username']
+            mapping[github_username] = sourcerer_username
+            self._remember(github_username, sourcerer_username,
+                           entry['expires'])
+
+        return mapping, misses
+
+    def store(self, mapping):
+        """Caches a dict of GitHub to Sourcerer usernames, None for none."""
+        now = time.time()
+        entries = []
+        for github_username, sourcerer_username in mapping.items():
+            ttl = self.ttl if sourcerer_username else self.negative_ttl
+            entry = {'github_username': github_username,
+                     'sourcerer_username': sourcerer_username or None,
+                     'expires': now + ttl}
+            self._remember(github_username, sourcerer_username,
+                           entry['expires'])
+            entries.append(entry)
+
+        parallel.parallel_map(
+            lambda e: self.stored.save(e['github_username'], e), entries)
+
+    def _remember(self, github_username, sourcerer_username, expires):
+        ttl = max(0, expires - time.time())
+        self.memory.put(github_username, sourcerer_username or '', ttl=ttl)
+
+
+# Shared by all halls of fame made in a process.
+user_mapping_cache = UserMappingCache()
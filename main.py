@@ -4,10 +4,14 @@ __copyright__ = '2018 Sourcerer, Inc.'
 __author__ = 'Sergey Surkov'
 
 import os
+from datetime import datetime
 
 import flask
 from google.cloud import pubsub
 
+import fame.glory
+import fame.parallel
+import fame.scheduler
 import fame.ssl_hack
 import fame.storage
 from fame.github_tracker import RepoTracker
@@ -33,11 +37,16 @@ class Manage:
 class Refresh:
     """Refresh commands."""
     REFRESH = 'refresh'  # Update repo stats and make badges (update+glorify).
-    REFRESH_ALL = 'refresh-all'  # Refresh all repos.
+    REFRESH_ALL = 'refresh-all'  # Refresh all repos due in this time slot.
+    CLEANUP = 'cleanup'  # Delete cached avatars and user mappings.
+
+    # Max number of refresh messages published in one batch.
+    MAX_BATCH = 100
 
     @staticmethod
     def is_valid(command):
-        return command in [Refresh.REFRESH, Refresh.REFRESH_ALL]
+        return command in [Refresh.REFRESH, Refresh.REFRESH_ALL,
+                           Refresh.CLEANUP]
 
 
 def error(message):
@@ -58,7 +67,18 @@ def make_error_response(error_code, message):
 def configure_storage():
     bucket = os.environ.get('bucket', None)
     error_if_false(bucket, 'Google cloud bucket is required')
-    fame.storage.configure_for_google_cloud(os.environ['bucket'])
+    # Warm instances keep what they read and write in memory.
+    cache_size = int(os.environ.get('storage_cache_size',
+                                    fame.storage.CachingStorage.MAX_SIZE))
+    fame.storage.configure_for_google_cloud(os.environ['bucket'], cache_size)
+
+
+def configure_tracker():
+    save_format = os.environ.get('save_format', RepoTracker.TEXT)
+    RepoTracker.set_save_format(save_format)
+    graphql_url = os.environ.get('github_graphql_url', None)
+    if graphql_url:
+        RepoTracker.set_graphql_url(graphql_url)
 
 
 def get_fame_pubsub_topic():
@@ -87,6 +107,7 @@ def fame_manage(request):
         error_if_false(user, 'User is required')
 
         configure_storage()
+        configure_tracker()
         topic = get_fame_pubsub_topic()  # Let it fail early.
 
         if command in [Manage.ADD, Manage.REMOVE]:
@@ -101,7 +122,7 @@ def fame_manage(request):
 
         if command == Manage.ADD:
             tracker.configure(user, owner, repo)
-            tracker.add()
+            tracker.add(data.get('fetcher', 'rest'))
             client = pubsub.PublisherClient()
             client.publish(topic, b'', command=Refresh.REFRESH,
                            user=user, owner=owner, repo=repo)
@@ -142,16 +163,40 @@ def fame_refresh(data, context):
         sourcerer_api_secret = os.environ.get('sourcerer_api_secret', None)
         if os.environ.get('no_ssl_host_check', None) == '1':
             fame.ssl_hack.disable_ssl_host_check()
+        max_in_flight = os.environ.get('max_in_flight', None)
+        if max_in_flight:
+            fame.parallel.configure(int(max_in_flight))
 
         configure_storage()
+        configure_tracker()
         topic = get_fame_pubsub_topic()  # Let it fail early.
 
-        if command == Refresh.REFRESH_ALL:  # Enqueue refresh for all repos.
-            client = pubsub.PublisherClient()
-            for user, owner, repo, _, _, _ in RepoTracker.list():
-                client.publish(topic, b'', command=Refresh.REFRESH,
-                               user=user, owner=owner, repo=repo)
+        if command == Refresh.REFRESH_ALL:  # Enqueue refresh for due repos.
+            # Refresh-all must be triggered once per slot, e.g. every
+            # 5 minutes for 12 slots, as the refresh period is an hour.
+            num_slots = int(os.environ.get('refresh_slots', '1'))
+            now = datetime.utcnow()
+            repos = RepoTracker.list_keys()
+            due_repos = fame.scheduler.get_due_repos(repos, now, num_slots)
+
+            batch_settings = pubsub.types.BatchSettings(
+                max_messages=Refresh.MAX_BATCH)
+            client = pubsub.PublisherClient(batch_settings=batch_settings)
+            futures = []
+            for user, owner, repo in due_repos:
+                futures.append(client.publish(
+                    topic, b'', command=Refresh.REFRESH,
+                    user=user, owner=owner, repo=repo))
                 print('i Enqueued for refresh %s:%s/%s' % (user, owner, repo))
+            for future in futures:
+                future.result()
+            print('i Enqueued %d of %d repos' % (len(due_repos), len(repos)))
+
+        elif command == Refresh.CLEANUP:  # Meant to be triggered daily.
+            try:
+                fame.glory.cleanup_caches()
+            except Exception as e:
+                print('w Failed to clean up caches: %s' % str(e))
 
         elif command == Refresh.REFRESH:  # Do an actual refresh for a repo.
             user = attrs.get('user', None)
@@ -169,7 +214,11 @@ def fame_refresh(data, context):
                               sourcerer_api_secret=sourcerer_api_secret)
             tracker.update()
 
-            glory = Glory(sourcerer_origin, sourcerer_api_origin)
+            install_mode = os.environ.get('install_mode', Glory.TEMP_INSTALL)
+            compress = os.environ.get('compress_images', None) == '1'
+            output = os.environ.get('output', Glory.SLOTS_OUTPUT)
+            glory = Glory(sourcerer_origin, sourcerer_api_origin,
+                          install_mode, compress, output)
             glory.make(tracker.load())
 
     except Exception as e:
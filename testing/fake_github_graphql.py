@@ -0,0 +1,122 @@
+"""A fake server for GitHub GraphQL API testing.
+
+Serves the queries of fame.github_graphql, telling them apart by operation
+name, out of commits in a JSON file, a list of objects like this one:
+
+  {"sha": "...", "login": "...", "avatar_url": "...",
+   "date": "2018-08-01T12:00:00Z"}
+
+Use --github_graphql_url=http://localhost:8001/graphql with do.py.
+"""
+
+__copyright__ = '2018 Sourcerer'
+__author__ = 'Sergey Surkov (sergey@sourcerer.io)'
+
+import argparse
+import json
+import http.server
+import re
+import socketserver
+
+PORT = 8001
+
+
+class GraphQLHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != '/graphql':
+            self.send_error(404)
+            return
+        if 'Authorization' not in self.headers:
+            self.send_error(401)
+            return
+
+        length = int(self.headers['Content-Length'])
+        request = json.loads(self.rfile.read(length).decode())
+        match = re.search(r'query\s+(\w+)', request['query'])
+        operation = match.group(1) if match else None
+        variables = request.get('variables', {})
+
+        if operation == 'RecentCommits':
+            resp = recent_commits(variables)
+        elif operation == 'UserIds':
+            resp = user_ids(variables)
+        elif operation == 'HistoryByAuthors':
+            resp = history_by_authors(variables)
+        else:
+            resp = {'errors': [{'message': 'Unknown query'}]}
+
+        data = bytes(json.dumps(resp), 'utf-8')
+        self._set_headers()
+        self.wfile.write(data)
+
+    def _set_headers(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+
+
+def recent_commits(variables):
+    matching = [c for c in commits if c['date'] >= variables['since']]
+    start = int(variables['after'] or 0)
+    end = start + variables['first']
+
+    nodes = []
+    for c in matching[start:end]:
+        user = {'id': user_id(c['login']), 'login': c['login'],
+                'avatarUrl': c['avatar_url']}
+        nodes.append({'oid': c['sha'],
+                      'author': {'date': c['date'], 'user': user}})
+
+    history = {'pageInfo': {'hasNextPage': end < len(matching),
+                            'endCursor': str(end)},
+               'nodes': nodes}
+    return wrap_target({'history': history})
+
+
+def user_ids(variables):
+    logins = {c['login'] for c in commits}
+    data = {}
+    for alias, login in variables.items():
+        data[alias] = {'id': user_id(login)} if login in logins else None
+    return {'data': data}
+
+
+def history_by_authors(variables):
+    target = {}
+    for alias, author_id in variables.items():
+        if not alias.startswith('a'):
+            continue
+        nodes = [{'oid': c['sha']} for c in commits
+                 if user_id(c['login']) == author_id and
+                 c['date'] <= variables['until']]
+        target[alias] = {'nodes': nodes[:1]}
+    return wrap_target(target)
+
+
+def wrap_target(target):
+    return {'data': {'repository': {'defaultBranchRef': {'target': target}}}}
+
+
+def user_id(login):
+    return 'user-' + login
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=PORT, help='Server port')
+    parser.add_argument('--commits', type=str, default='commits.json',
+                        help='Commits to serve, newest first')
+    args = parser.parse_args()
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+
+    commits = json.load(open(args.commits))
+
+    print('i Loaded %d commits from %s' % (len(commits), args.commits))
+
+    with socketserver.TCPServer(("", args.port), GraphQLHandler) as httpd:
+        print("i Serving at port", args.port)
+        httpd.serve_forever()